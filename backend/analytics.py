@@ -0,0 +1,240 @@
+import json
+import base64
+from fastapi import HTTPException, Query
+from sqlalchemy import text
+from rollups import TREND_START_YEAR, TREND_END_YEAR
+
+# Filtered analytics over the contracts table. Unfiltered requests are served from the rollups
+# (rollups.py); once a filter is set, the query aggregates only the matching slice. Filters are
+# bound parameters on indexed columns, and years become a start_date range so Postgres can use
+# the (column, start_date) indexes and prune year partitions (migrations.py).
+
+# Query parameter -> contracts column, matched exactly
+FILTER_COLUMNS = {
+    "agency": "agency",
+    "sub_agency": "awarding_sub_agency",
+    "place": "place_of_performance",
+    "category": "contract_category",
+    "naics": "naics_code",
+    "psc": "psc_code",
+}
+
+# Columns the ranked lists can be grouped by
+RANKED_COLUMNS = {"agency": "agency", "place": "place_of_performance"}
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+class ContractFilters:
+    """Optional slice of contracts: a start-year range plus exact matches on FILTER_COLUMNS."""
+
+    def __init__(self, start_year=None, end_year=None, **values):
+        if start_year is not None and end_year is not None and start_year > end_year:
+            raise HTTPException(status_code=400, detail="start_year must not be after end_year")
+        self.start_year = start_year
+        self.end_year = end_year
+        self.values = {name: value for name, value in values.items() if value is not None}
+
+    def is_empty(self):
+        return self.start_year is None and self.end_year is None and not self.values
+
+    def where(self):
+        """Returns (SQL conditions joined with AND, bind parameters)."""
+        conditions = []
+        params = {}
+        if self.start_year is not None:
+            conditions.append("start_date >= make_date(:start_year, 1, 1)")
+            params["start_year"] = self.start_year
+        if self.end_year is not None:
+            conditions.append("start_date < make_date(:end_year + 1, 1, 1)")
+            params["end_year"] = self.end_year
+        for name, value in self.values.items():
+            conditions.append(f"{FILTER_COLUMNS[name]} = :{name}")
+            params[name] = value
+        return " AND ".join(conditions) or "TRUE", params
+
+
+def contract_filters(
+    start_year: int | None = Query(None, ge=1900, le=2100),
+    end_year: int | None = Query(None, ge=1900, le=2100),
+    agency: str | None = None,
+    sub_agency: str | None = None,
+    place: str | None = None,
+    category: str | None = None,
+    naics: str | None = None,
+    psc: str | None = None,
+):
+    """FastAPI dependency collecting the shared filter query parameters."""
+    return ContractFilters(
+        start_year, end_year,
+        agency=agency, sub_agency=sub_agency, place=place, category=category, naics=naics, psc=psc,
+    )
+
+
+# ========================== KEYSET CURSORS ========================== #
+
+def encode_cursor(contract_count, key):
+    """Opaque cursor for the row after (contract_count, key) in (count DESC, key ASC) order.
+
+    Keys compare bytewise (COLLATE "C") so pages don't depend on the database locale.
+    """
+    raw = json.dumps([contract_count, key]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        contract_count, key = json.loads(raw)
+        return int(contract_count), str(key)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(conn, source, key_column, params, limit, cursor):
+    """Top-N page of `source` (a table or subquery with key_column, contract_count, total_award).
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    condition = "TRUE"
+    params = dict(params, limit=limit + 1)  # One extra row tells whether another page exists
+    if cursor:
+        params["after_count"], params["after_key"] = decode_cursor(cursor)
+        condition = f"""(contract_count < :after_count
+                        OR (contract_count = :after_count AND {key_column} COLLATE "C" > :after_key))"""
+    query = text(f"""
+        SELECT {key_column}, contract_count, total_award
+        FROM {source} ranked
+        WHERE contract_count > 0 AND {condition}
+        ORDER BY contract_count DESC, {key_column} COLLATE "C"
+        LIMIT :limit
+    """)
+    rows = [dict(row._mapping) for row in conn.execute(query, params)]
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]["contract_count"], rows[-1][key_column])
+
+
+# ========================== QUERIES ========================== #
+
+def ranked(conn, group_by, filters, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """Agencies or places ranked by contract count, from the rollups when unfiltered."""
+    column = RANKED_COLUMNS[group_by]
+    if filters.is_empty():
+        return keyset_page(conn, f"rollup_{'agencies' if group_by == 'agency' else 'places'}",
+                           column, {}, limit, cursor)
+    where, params = filters.where()
+    source = f"""(
+        SELECT {column}, COUNT(*) AS contract_count, SUM(award_amount) AS total_award
+        FROM contracts
+        WHERE {where} AND {column} IS NOT NULL
+        GROUP BY {column}
+    )"""
+    return keyset_page(conn, source, column, params, limit, cursor)
+
+
+def monthly_trends(conn, filters):
+    """Contract count and median award per calendar month of the filtered slice."""
+    if filters.start_year is None and filters.end_year is None:
+        # The chart's historical window, as served by the rollups
+        filters = ContractFilters(TREND_START_YEAR, TREND_END_YEAR, **filters.values)
+    where, params = filters.where()
+    query = text(f"""
+        SELECT EXTRACT(MONTH FROM start_date) AS month,
+               COUNT(*) AS contract_count,
+               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY award_amount) AS median_award_amount
+        FROM contracts
+        WHERE {where} AND start_date IS NOT NULL
+        GROUP BY month
+        ORDER BY month
+    """)
+    return [dict(row._mapping) for row in conn.execute(query, params)]
+
+
+def category_breakdown(conn, filters):
+    where, params = filters.where()
+    query = text(f"""
+        SELECT contract_category,
+               COUNT(*) * 100.0 / SUM(COUNT(*)) OVER () AS contract_percentage
+        FROM contracts
+        WHERE {where}
+        GROUP BY contract_category
+    """)
+    return [dict(row._mapping) for row in conn.execute(query, params)]
+
+
+def period_counts(conn, filters):
+    """Per-(year, month) counts and award totals of the filtered slice."""
+    where, params = filters.where()
+    query = text(f"""
+        SELECT EXTRACT(YEAR FROM start_date)::int AS year, EXTRACT(MONTH FROM start_date)::int AS month,
+               COUNT(*) AS contract_count, SUM(award_amount) AS total_award
+        FROM contracts
+        WHERE {where} AND start_date IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """)
+    return [dict(row._mapping) for row in conn.execute(query, params)]
+
+
+def award_percentiles(conn, filters, qs):
+    """Exact award percentiles of the filtered slice, for filters the sketches can't answer."""
+    where, params = filters.where()
+    query = text(f"""
+        SELECT COUNT(*) AS contract_count,
+               PERCENTILE_CONT(CAST(:qs AS double precision[])) WITHIN GROUP (ORDER BY award_amount) AS amounts
+        FROM contracts
+        WHERE {where}
+    """)
+    row = conn.execute(query, dict(params, qs=list(qs))).one()
+    return {
+        "contract_count": row.contract_count,
+        "relative_accuracy": 0,
+        "percentiles": {f"p{round(q * 100, 3):g}": value for q, value in zip(qs, row.amounts or [None] * len(qs))},
+    }
+
+
+def dashboard_facets(conn, filters, limit=DEFAULT_PAGE_SIZE):
+    """Agency, place, category and total facets of the filtered slice in one scan (GROUPING SETS)."""
+    where, params = filters.where()
+    query = text(f"""
+        SELECT CASE WHEN GROUPING(agency) = 0 THEN 'agency'
+                    WHEN GROUPING(place_of_performance) = 0 THEN 'place'
+                    WHEN GROUPING(contract_category) = 0 THEN 'category'
+                    ELSE 'total' END AS facet,
+               COALESCE(agency, place_of_performance, contract_category) AS key,
+               COUNT(*) AS contract_count, COALESCE(SUM(award_amount), 0) AS total_award
+        FROM contracts
+        WHERE {where}
+        GROUP BY GROUPING SETS ((agency), (place_of_performance), (contract_category), ())
+    """)
+    rows = [dict(row._mapping) for row in conn.execute(query, params)]
+    return dashboard(rows, limit)
+
+
+def dashboard(rows, limit=DEFAULT_PAGE_SIZE):
+    """Shapes facet rows (facet, key, contract_count, total_award) like the individual routes."""
+    facets = {"agency": [], "place": [], "category": [], "total": []}
+    for row in rows:
+        facets[row["facet"]].append(row)
+    total = facets["total"][0] if facets["total"] else {"contract_count": 0, "total_award": 0}
+
+    def top(facet, column):
+        ranked = sorted(
+            (row for row in facets[facet] if row["key"] is not None and row["contract_count"] > 0),
+            key=lambda row: (-row["contract_count"], row["key"]),  # Same order as keyset_page
+        )
+        return [{column: row["key"], "contract_count": row["contract_count"], "total_award": row["total_award"]}
+                for row in ranked[:limit]]
+
+    return {
+        "agency_funding": top("agency", "agency"),
+        "place_performance": top("place", "place_of_performance"),
+        "category_breakdown": [
+            {"contract_category": row["key"], "contract_percentage": row["contract_count"] * 100.0 / total["contract_count"]}
+            for row in facets["category"] if row["contract_count"] > 0
+        ],
+        "totals": {"contract_count": total["contract_count"], "total_award": total["total_award"]},
+    }
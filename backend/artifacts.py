@@ -0,0 +1,68 @@
+import os
+import time
+import resource
+import threading
+
+# Model artifacts the API loads on first use rather than at import, with the resident memory
+# of this worker process before and after each load. /api/ml/models reports them per worker:
+# rss_file_mb is file-backed memory (memory-mapped arrays shared through the page cache),
+# rss_anon_mb is private to the worker.
+
+
+def memory_usage():
+    """Resident memory of this process in MB: total, anonymous (private) and file-backed."""
+    usage = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "RssAnon", "RssFile"):
+                    usage[key] = int(value.split()[0]) / 1024  # kB
+    except OSError:  # Not Linux: peak RSS is the best available
+        usage["VmRSS"] = peak_memory_mb()
+    return {
+        "rss_mb": round(usage.get("VmRSS", 0.0), 1),
+        "rss_anon_mb": round(usage["RssAnon"], 1) if "RssAnon" in usage else None,
+        "rss_file_mb": round(usage["RssFile"], 1) if "RssFile" in usage else None,
+    }
+
+
+def peak_memory_mb():
+    """Highest resident memory of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024)  # Bytes on macOS, kB elsewhere
+
+
+class LazyArtifact:
+    """Loads `loader()` once, on the first get(); concurrent first calls wait for the same load."""
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.value = None
+        self.loaded = False
+        self.lock = threading.Lock()
+        self.stats = {"load_ms": None, "memory_before": None, "memory_after": None}
+
+    def get(self):
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    before = memory_usage()
+                    started = time.perf_counter()
+                    self.value = self.loader()
+                    self.stats = {
+                        "load_ms": round((time.perf_counter() - started) * 1000, 1),
+                        "memory_before": before,
+                        "memory_after": memory_usage(),
+                    }
+                    self.loaded = True
+                    print(f"Loaded {self.name} in {self.stats['load_ms']:.0f} ms")
+        return self.value
+
+    def report(self):
+        return {"name": self.name, "loaded": self.loaded, **self.stats}
+
+
+def memory_report(artifacts):
+    return {"pid": os.getpid(), "memory": memory_usage(), "artifacts": [artifact.report() for artifact in artifacts]}
@@ -0,0 +1,108 @@
+import io
+import os
+import csv
+import json
+import math
+import warnings
+import joblib
+import pyarrow.parquet as pq
+
+# Batch scoring for POST /api/ml/predict-award/batch. Rows arrive as JSON, CSV or Parquet,
+# are encoded straight into one sparse matrix (CompiledAwardPipeline.encode_batch) and scored
+# by RandomForestRegressor.predict with its trees spread over all cores, a chunk of rows per
+# call. Results stream back as NDJSON or CSV, in input order, as each chunk is scored.
+
+# Same names as the predict-award query parameters
+BATCH_FIELDS = ["agency", "funding_agency", "place", "awarding_sub_agency", "funding_sub_agency"]
+DURATION_FIELD = "contract_duration"
+
+MAX_BATCH_ROWS = 100000
+BATCH_CHUNK_SIZE = 20000  # Rows per predict call
+BATCH_JOBS = int(os.getenv("BATCH_JOBS", -1))  # Threads for predict; -1 uses every core
+
+INPUT_FORMATS = {
+    "application/json": "json",
+    "text/csv": "csv",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+OUTPUT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# The model was fitted on a DataFrame; the sparse matrix holds the same columns in the same order.
+# Filtered by message only, so every other warning still shows.
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+def read_records(body, content_type):
+    """Rows of the request body as a list of dicts."""
+    fmt = INPUT_FORMATS.get(content_type.split(";")[0].strip().lower())
+    if fmt == "json":
+        records = json.loads(body)
+        if isinstance(records, dict):
+            records = records.get("rows")
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise ValueError('JSON body must be a list of rows or {"rows": [...]}')
+        return records
+    if fmt == "csv":
+        return list(csv.DictReader(io.StringIO(body.decode("utf-8-sig"))))
+    if fmt == "parquet":
+        return pq.read_table(io.BytesIO(body)).to_pylist()
+    raise ValueError(f"Unsupported content type '{content_type}', expected one of {', '.join(INPUT_FORMATS)}")
+
+
+def read_rows(body, content_type):
+    """Validates every row; returns (one list of values per categorical field, contract durations).
+
+    Runs before the response starts streaming, so any bad row is a 400 rather than a broken stream.
+    """
+    try:
+        records = read_records(body, content_type)
+    except (UnicodeDecodeError, json.JSONDecodeError, OSError) as e:
+        raise ValueError(f"Could not parse request body: {e}")
+    if not records:
+        raise ValueError("No rows to score")
+    if len(records) > MAX_BATCH_ROWS:
+        raise ValueError(f"At most {MAX_BATCH_ROWS} rows per batch, got {len(records)}")
+
+    values = [[] for _ in BATCH_FIELDS]
+    durations = []
+    for i, record in enumerate(records):
+        missing = [field for field in BATCH_FIELDS + [DURATION_FIELD] if field not in record]
+        if missing:
+            raise ValueError(f"Row {i}: missing fields: {', '.join(missing)}")
+        for column, field in zip(values, BATCH_FIELDS):
+            if not isinstance(record[field], str):
+                raise ValueError(f"Row {i}: {field} must be a string")
+            column.append(record[field])
+        try:
+            duration = float(record[DURATION_FIELD])
+        except (TypeError, ValueError):
+            raise ValueError(f"Row {i}: contract_duration must be a number")
+        if not math.isfinite(duration):
+            raise ValueError(f"Row {i}: contract_duration must be a finite number")
+        durations.append(duration)
+    return values, durations
+
+
+def predict_chunks(pipeline, model, values, durations, chunk_size=BATCH_CHUNK_SIZE):
+    """Yields (first row index, predictions) per chunk of rows."""
+    for start in range(0, len(durations), chunk_size):
+        end = start + chunk_size
+        X = pipeline.encode_batch([column[start:end] for column in values], durations[start:end])
+        with joblib.parallel_backend("threading", n_jobs=BATCH_JOBS):
+            yield start, model.predict(X)
+
+
+def predict_stream(pipeline, model, values, durations, fmt="ndjson"):
+    """Encoded results as byte chunks: {"row", "predicted_award_amount"} per input row."""
+    if fmt == "csv":
+        yield b"row,predicted_award_amount\n"
+    for start, predictions in predict_chunks(pipeline, model, values, durations):
+        if fmt == "csv":
+            lines = (f"{start + i},{round(prediction, 2)}\n" for i, prediction in enumerate(predictions.tolist()))
+        else:
+            lines = (
+                json.dumps({"row": start + i, "predicted_award_amount": round(prediction, 2)}) + "\n"
+                for i, prediction in enumerate(predictions.tolist())
+            )
+        yield "".join(lines).encode()
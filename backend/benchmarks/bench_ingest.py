@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import resource
+import argparse
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy.sql import text
+from database import SessionLocal
+from fetcher import fetch_pages
+from ingest import ingest_stream
+from usaspending_stub import StubConfig, start_stub
+
+# End-to-end ingestion benchmark against the local stub: fetch + save_to_db, reporting
+# records/sec, API request count and peak memory. Nothing touches api.usaspending.gov.
+#
+#   python bench_ingest.py --pipeline stream --years 2 --pages 5 --latency 0.2 --error-rate 0.05
+#   python bench_ingest.py --pipeline fetch-only --years 1 --latency 0.2
+
+
+def cleanup():
+    with SessionLocal() as session:
+        session.execute(text("DELETE FROM contracts WHERE contract_id LIKE 'STUB-%'"))
+        session.commit()
+
+
+def run_stream(api_url, years, pages, fetcher_options):
+    jobs = ((year, month, page) for year in years for month in range(1, 13) for page in range(1, pages + 1))
+    return ingest_stream(jobs, api_url=api_url, **fetcher_options)["inserted"]
+
+
+def run_fetch_only(api_url, years, pages, fetcher_options):
+    jobs = [(year, month, page) for year in years for month in range(1, 13) for page in range(1, pages + 1)]
+    contracts, _ = fetch_pages(jobs, api_url=api_url, **fetcher_options)
+    return len(contracts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ingestion throughput against a local stub.")
+    parser.add_argument("--pipeline", choices=["stream", "fetch-only"], default="stream")
+    parser.add_argument("--years", type=int, default=1, help="Number of years, starting at 2015")
+    parser.add_argument("--pages", type=int, default=1, help="Pages per month")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-delay", type=float, default=35.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=50.0)
+    parser.add_argument("--burst", type=int, default=16)
+    parser.add_argument("--keep", action="store_true", help="Keep the STUB-* rows afterwards")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate, timeout_delay=args.timeout_delay, seed=42
+    )
+    server, api_url = start_stub(config)
+    years = list(range(2015, 2015 + args.years))
+    fetcher_options = {"concurrency": args.concurrency, "rate": args.rate, "burst": args.burst}
+
+    if args.pipeline != "fetch-only":
+        cleanup()
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        if args.pipeline == "stream":
+            records = run_stream(api_url, years, args.pages, fetcher_options)
+        else:
+            records = run_fetch_only(api_url, years, args.pages, fetcher_options)
+        elapsed = time.perf_counter() - started
+        _, peak_python = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        server.shutdown()
+        if args.pipeline != "fetch-only" and not args.keep:
+            cleanup()
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    print(f"\npipeline={args.pipeline} years={args.years} pages/month={args.pages}")
+    print(f"records:        {records}")
+    print(f"elapsed:        {elapsed:.2f}s")
+    print(f"records/sec:    {records / elapsed:.1f}")
+    print(f"API requests:   {config.stats['requests']} ({config.stats['errors']} 502s, {config.stats['timeouts']} timeouts)")
+    print(f"peak traced:    {peak_python / 1e6:.1f} MB")
+    print(f"peak RSS:       {peak_rss:.1f} MB")
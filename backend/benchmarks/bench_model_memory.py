@@ -0,0 +1,66 @@
+import os
+import sys
+import argparse
+import multiprocessing
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import joblib
+from artifacts import memory_usage
+from inference import CompiledAwardPipeline, COMPILED_DIR
+
+# Starts several worker processes that each load the award model the way an API worker would,
+# either by unpickling the forest or by mapping the compiled arrays, run one prediction, and
+# report resident memory before and after. PSS splits shared pages between the processes that
+# map them, so its total shows what the workers cost together.
+#
+#   python bench_model_memory.py --workers 4
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+
+
+def proportional_set_size():
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def worker(mode, model_dir, results, done):
+    before = memory_usage()
+    if mode == "pickle":
+        model = joblib.load(os.path.join(model_dir, "award_prediction.pkl"))
+        model.predict([[0.0] * model.n_features_in_])
+    else:
+        pipeline = CompiledAwardPipeline.load(os.path.join(model_dir, COMPILED_DIR))
+        pipeline.predict(*[next(iter(columns), None) for columns in pipeline.columns], 365)
+    results.put((os.getpid(), before, memory_usage(), proportional_set_size()))
+    done.get()  # Stay alive until every worker has measured, so shared pages are counted once
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-worker memory of pickled vs memory-mapped award models.")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    for mode in ("pickle", "mmap"):
+        results, done = context.Queue(), context.Queue()
+        processes = [context.Process(target=worker, args=(mode, args.model_dir, results, done)) for _ in range(args.workers)]
+        for process in processes:
+            process.start()
+        reports = [results.get() for _ in processes]
+        for _ in processes:
+            done.put(None)
+        for process in processes:
+            process.join()
+
+        print(f"{mode}:")
+        for pid, before, after, _ in reports:
+            print(f"  worker {pid}: rss {before['rss_mb']:7.1f} -> {after['rss_mb']:7.1f} MB"
+                  f"  (private {after['rss_anon_mb']} MB, file-backed {after['rss_file_mb']} MB)")
+        pss = [report[3] for report in reports]
+        if None not in pss:
+            print(f"  total PSS across {args.workers} workers: {sum(pss):.1f} MB")
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import random
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import joblib
+import numpy as np
+import pandas as pd
+from inference import CompiledAwardPipeline, CATEGORICAL_FEATURES
+
+# Compares the compiled predict-award path (inference.py) with the per-request pandas path it
+# replaced: checks both give identical predictions on sampled inputs, then reports latency
+# percentiles for each. Exits non-zero on any mismatch.
+#
+#   python bench_predict.py --samples 2000
+#   python bench_predict.py --model-dir /path/to/models
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+
+
+def legacy_predict(model, encoder, feature_order_path, values, contract_duration):
+    """The original predict_award body, as a baseline."""
+    input_df = pd.DataFrame([values], columns=CATEGORICAL_FEATURES)
+    input_encoded = encoder.transform(input_df).toarray()
+    input_encoded_df = pd.DataFrame(input_encoded, dtype=float)
+    input_encoded_df.columns = input_encoded_df.columns.astype(str)
+    input_encoded_df["contract_duration"] = float(contract_duration)
+    feature_order = joblib.load(feature_order_path)
+    input_encoded_df = input_encoded_df.reindex(columns=feature_order, fill_value=0)
+    return model.predict(input_encoded_df)[0]
+
+
+def sample_inputs(encoder, samples, seed=0):
+    """Known categories, with a few unseen values mixed in (the encoder ignores those)."""
+    rng = random.Random(seed)
+    inputs = []
+    for _ in range(samples):
+        values = [
+            rng.choice(list(categories)) if rng.random() > 0.05 else "Unseen Value"
+            for categories in encoder.categories_
+        ]
+        inputs.append((values, rng.randint(1, 3650)))
+    return inputs
+
+
+def percentiles(timings):
+    ms = np.array(timings) * 1000
+    return {name: np.percentile(ms, q) for name, q in (("p50", 50), ("p95", 95), ("p99", 99))}
+
+
+def timed(fn, inputs):
+    timings = []
+    for values, duration in inputs:
+        started = time.perf_counter()
+        fn(values, duration)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the compiled predict-award path and compare latency.")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--samples", type=int, default=1000)
+    args = parser.parse_args()
+
+    model = joblib.load(os.path.join(args.model_dir, "award_prediction.pkl"))
+    encoder = joblib.load(os.path.join(args.model_dir, "one_hot_encoder.pkl"))
+    feature_order_path = os.path.join(args.model_dir, "feature_order.pkl")
+
+    started = time.perf_counter()
+    pipeline = CompiledAwardPipeline.from_model(model, encoder, joblib.load(feature_order_path))
+    print(f"Compiled {pipeline.n_trees} trees ({len(pipeline.value)} nodes) in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    inputs = sample_inputs(encoder, args.samples)
+
+    def legacy(values, duration):
+        return legacy_predict(model, encoder, feature_order_path, values, duration)
+
+    def compiled(values, duration):
+        return pipeline.predict(*values, duration)
+
+    mismatches = sum(legacy(values, duration) != compiled(values, duration) for values, duration in inputs)
+    print(f"{mismatches} of {len(inputs)} predictions differ")
+
+    for name, fn in (("legacy", legacy), ("compiled", compiled)):
+        fn(*inputs[0])  # Warm up
+        stats = percentiles(timed(fn, inputs))
+        print(f"{name:<9} " + "  ".join(f"{key} {value:8.3f} ms" for key, value in stats.items()))
+
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import text
+from database import engine
+
+# Runs EXPLAIN (ANALYZE, BUFFERS) for the analytics query shapes and reports execution time,
+# buffers and which relations/indexes were scanned. Save a run before migrating and compare:
+#
+#   python bench_query_plans.py --out before.json
+#   python ../migrations.py --partition
+#   python bench_query_plans.py --compare before.json
+
+QUERIES = {
+    "year count (EXTRACT)": """
+        SELECT COUNT(*) FROM contracts WHERE EXTRACT(YEAR FROM start_date) = 2020
+    """,
+    "year count (range)": """
+        SELECT COUNT(*) FROM contracts WHERE start_date >= DATE '2020-01-01' AND start_date < DATE '2021-01-01'
+    """,
+    "monthly trends (original)": """
+        SELECT EXTRACT(MONTH FROM start_date) AS month, COUNT(*),
+               PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY award_amount)
+        FROM contracts WHERE EXTRACT(YEAR FROM start_date) BETWEEN 2015 AND 2024
+        GROUP BY month ORDER BY month
+    """,
+    "month median (range, one month)": """
+        SELECT PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY award_amount) FROM contracts
+        WHERE start_date >= DATE '2015-01-01' AND start_date < DATE '2025-01-01'
+          AND EXTRACT(MONTH FROM start_date) = 3
+    """,
+    "agency slice for one year": """
+        SELECT COUNT(*), SUM(award_amount) FROM contracts
+        WHERE agency = :agency AND start_date >= DATE '2020-01-01' AND start_date < DATE '2021-01-01'
+    """,
+    "top places": """
+        SELECT place_of_performance, COUNT(*), SUM(award_amount) FROM contracts
+        WHERE place_of_performance IS NOT NULL
+        GROUP BY place_of_performance ORDER BY COUNT(*) DESC LIMIT 10
+    """,
+    "category breakdown for one year": """
+        SELECT contract_category, COUNT(*) FROM contracts
+        WHERE start_date >= DATE '2020-01-01' AND start_date < DATE '2021-01-01'
+        GROUP BY contract_category
+    """,
+}
+
+
+def walk(node, relations, indexes):
+    if "Relation Name" in node:
+        relations.add(node["Relation Name"])
+    if "Index Name" in node:
+        indexes.add(node["Index Name"])
+    for child in node.get("Plans", []):
+        walk(child, relations, indexes)
+
+
+def explain(conn, query, params):
+    plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}"), params).scalar()
+    plan = plan[0] if isinstance(plan, list) else json.loads(plan)[0]
+    relations, indexes = set(), set()
+    walk(plan["Plan"], relations, indexes)
+    return {
+        "execution_ms": plan["Execution Time"],
+        "top_node": plan["Plan"]["Node Type"],
+        "shared_blocks": plan["Plan"].get("Shared Hit Blocks", 0) + plan["Plan"].get("Shared Read Blocks", 0),
+        "relations": sorted(relations),
+        "indexes": sorted(indexes),
+    }
+
+
+def run(repeat):
+    results = {}
+    with engine.connect() as conn:
+        agency = conn.execute(text(
+            "SELECT agency FROM contracts GROUP BY agency ORDER BY COUNT(*) DESC LIMIT 1"
+        )).scalar()
+        for name, query in QUERIES.items():
+            runs = [explain(conn, query, {"agency": agency} if ":agency" in query else {}) for _ in range(repeat)]
+            best = min(runs, key=lambda r: r["execution_ms"])  # Warm-cache timing
+            results[name] = best
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare query plans for the analytics queries.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="Save results as JSON")
+    parser.add_argument("--compare", help="JSON from an earlier run to compare against")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    for name, result in results.items():
+        line = f"{name:<34} {result['execution_ms']:9.2f} ms  {result['shared_blocks']:8d} blocks  {result['top_node']}"
+        if baseline and name in baseline:
+            before = baseline[name]["execution_ms"]
+            line += f"  (before {before:.2f} ms, {before / max(result['execution_ms'], 1e-3):.1f}x)"
+        print(line)
+        print(f"{'':<34} scans {', '.join(result['relations'])}; indexes {', '.join(result['indexes']) or 'none'}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved to {args.out}")
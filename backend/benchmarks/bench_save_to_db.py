@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+import uuid
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy.sql import text
+from database import SessionLocal
+from fetcher import parse_award
+from ingest import save_contracts
+from synthetic import synthetic_award
+
+# Compares the original per-row save_to_db path with the bulk INSERT ... ON CONFLICT path.
+# Rows are written under a unique prefix and deleted afterwards.
+
+
+def make_batch(prefix, size, duplicate_ratio):
+    contracts = [parse_award(synthetic_award(i, prefix=prefix)) for i in range(size)]
+    contracts += contracts[:int(size * duplicate_ratio)]  # In-batch duplicates
+    return contracts
+
+
+def run(label, batches, bulk):
+    started = time.perf_counter()
+    totals = {"inserted": 0, "duplicates": 0, "skipped": 0}
+    for batch in batches:
+        counts = save_contracts(batch, bulk=bulk)
+        if counts is None:
+            sys.exit(f"{label}: a batch failed to save")
+        for key in totals:
+            totals[key] += counts[key]
+    elapsed = time.perf_counter() - started
+    rows = sum(len(batch) for batch in batches)
+    print(f"{label:>13}: {elapsed:7.2f}s  {rows / elapsed:9.0f} rows/s  {totals}")
+    return elapsed
+
+
+def cleanup(prefix):
+    with SessionLocal() as session:
+        session.execute(text("DELETE FROM contracts WHERE contract_id LIKE :prefix"), {"prefix": f"{prefix}%"})
+        session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark save_to_db: per-row vs bulk upsert.")
+    parser.add_argument("--batches", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = {}
+    for label, bulk in (("per-row", False), ("bulk", True)):
+        prefix = f"BENCH{uuid.uuid4().hex[:8]}"
+        batches = [make_batch(f"{prefix}{b}", args.batch_size, args.duplicate_ratio) for b in range(args.batches)]
+        try:
+            results[label] = run(label, batches, bulk)
+            # Second pass: every row already exists
+            run(f"{label} rerun", batches, bulk)
+        finally:
+            cleanup(prefix)
+
+    print(f"Bulk speedup: {results['per-row'] / results['bulk']:.1f}x")
@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+import math
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import text
+from database import engine
+import rollups
+import analytics
+from analytics import ContractFilters
+from counters import get_period_counts
+from columnar import ColumnarStore
+
+# Loads the columnar engine and checks every aggregate it serves against the SQL path the API
+# would otherwise use, for a spread of filters, then compares latency. Exits non-zero on mismatch.
+#
+#   python columnar_parity.py --repeat 200
+
+
+def same(a, b):
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(same(a[key], b[key]) for key in a)
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    if a is None or b is None or isinstance(a, str) or isinstance(b, str):
+        return a == b
+    return math.isclose(float(a), float(b), rel_tol=1e-9, abs_tol=1e-6)
+
+
+def by_category(rows):
+    return sorted(rows, key=lambda row: (row["contract_category"] is None, row["contract_category"] or ""))
+
+
+def filter_sets(conn):
+    agency = conn.execute(text("SELECT agency FROM rollup_agencies ORDER BY contract_count DESC LIMIT 1")).scalar()
+    place = conn.execute(text("SELECT place_of_performance FROM rollup_places ORDER BY contract_count DESC LIMIT 1")).scalar()
+    category = conn.execute(text("SELECT NULLIF(contract_category, '') FROM rollup_categories ORDER BY contract_count DESC LIMIT 1")).scalar()
+    return {
+        "unfiltered": ContractFilters(),
+        "2020-2022": ContractFilters(2020, 2022),
+        "agency": ContractFilters(agency=agency),
+        "agency 2021": ContractFilters(2021, 2021, agency=agency),
+        "place + category": ContractFilters(place=place, category=category),
+        "unknown agency": ContractFilters(agency="No Such Agency"),
+    }
+
+
+def cases(conn, store, filters):
+    """(name, SQL callable, engine callable) for each route shape, mirroring api.py's routing."""
+    def sql_trends():
+        return rollups.monthly_trends(conn) if filters.is_empty() else analytics.monthly_trends(conn, filters)
+
+    def sql_categories():
+        return by_category(rollups.category_breakdown(conn) if filters.is_empty() else analytics.category_breakdown(conn, filters))
+
+    def sql_counts():
+        if filters.values:
+            return analytics.period_counts(conn, filters)
+        return get_period_counts(conn, filters.start_year or rollups.TREND_START_YEAR, filters.end_year or rollups.TREND_END_YEAR)
+
+    count_filters = filters if filters.values else ContractFilters(
+        filters.start_year or rollups.TREND_START_YEAR, filters.end_year or rollups.TREND_END_YEAR)
+    return [
+        ("monthly-trends", sql_trends, lambda: store.monthly_trends(filters)),
+        ("category-breakdown", sql_categories, lambda: by_category(store.category_breakdown(filters))),
+        ("counts", sql_counts, lambda: store.period_counts(count_filters)),
+        ("agency-funding", lambda: analytics.ranked(conn, "agency", filters, 10), lambda: store.ranked("agency", filters, 10)),
+        ("place-performance", lambda: analytics.ranked(conn, "place", filters, 10), lambda: store.ranked("place", filters, 10)),
+    ]
+
+
+def check_pages(conn, store, group_by, filters, pages=5):
+    """Walks a few keyset pages on both paths and checks rows and cursors agree."""
+    cursor = None
+    for _ in range(pages):
+        sql_rows, sql_cursor = analytics.ranked(conn, group_by, filters, 7, cursor)
+        engine_rows, engine_cursor = store.ranked(group_by, filters, 7, cursor)
+        if not same(sql_rows, engine_rows) or sql_cursor != engine_cursor:
+            return False
+        if sql_cursor is None:
+            break
+        cursor = sql_cursor
+    return True
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the columnar engine against SQL and compare latency.")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    store = ColumnarStore()
+    store.refresh()
+    print(f"Loaded {store.stats['rows']} contracts in {store.stats['last_refresh_ms']:.0f} ms")
+
+    failures = 0
+    with engine.connect() as conn:
+        for label, filters in filter_sets(conn).items():
+            for name, sql, columnar in cases(conn, store, filters):
+                ok = same(sql(), columnar())
+                failures += not ok
+                sql_ms, engine_ms = timed(sql, args.repeat), timed(columnar, args.repeat)
+                print(f"{'ok  ' if ok else 'FAIL'} {label:<18} {name:<20} sql {sql_ms:8.3f} ms  engine {engine_ms:8.3f} ms")
+            for group_by in analytics.RANKED_COLUMNS:
+                ok = check_pages(conn, store, group_by, filters)
+                failures += not ok
+                print(f"{'ok  ' if ok else 'FAIL'} {label:<18} {group_by + ' pages':<20}")
+
+    print(f"{failures} mismatches")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,37 @@
+import random
+
+AGENCIES = [
+    "Department of Defense", "Department of Veterans Affairs", "Department of Health and Human Services",
+    "General Services Administration", "Department of Homeland Security", "Department of Energy",
+    "National Aeronautics and Space Administration", "Department of Justice"
+]
+SUB_AGENCIES = ["Department of the Army", "Department of the Navy", "Department of the Air Force",
+                "Defense Logistics Agency", "Veterans Health Administration", "Public Buildings Service"]
+STATES = ["VA", "CA", "TX", "MD", "FL", "DC", "WA", "CO", "AL", "GA"]
+CATEGORIES = ["DEFINITIVE CONTRACT", "PURCHASE ORDER", "DELIVERY ORDER", "BPA CALL"]
+
+
+def synthetic_award(index, year=2020, month=1, prefix="BENCH", seed=None):
+    """Builds one spending_by_award result shaped like the real API response."""
+    rng = random.Random(f"{prefix}-{index}" if seed is None else seed)
+    day = rng.randint(1, 28)
+    return {
+        "internal_id": index,
+        "generated_internal_id": f"{prefix}-{year}{month:02d}-{index:08d}",
+        "Recipient Name": f"VENDOR {rng.randint(1, 5000)}",
+        "Award Amount": round(rng.lognormvariate(11, 2), 2),
+        "Total Outlays": round(rng.lognormvariate(10, 2), 2),
+        "COVID-19 Obligations": 0.0,
+        "Awarding Agency": rng.choice(AGENCIES),
+        "Awarding Sub Agency": rng.choice(SUB_AGENCIES),
+        "Funding Agency": rng.choice(AGENCIES),
+        "Funding Sub Agency": rng.choice(SUB_AGENCIES),
+        "Start Date": f"{year}-{month:02d}-{day:02d}",
+        "End Date": f"{year + rng.randint(0, 3)}-{month:02d}-{day:02d}",
+        "Place of Performance State Code": rng.choice(STATES),
+        "Place of Performance Country Code": "USA",
+        "Contract Award Type": rng.choice(CATEGORIES),
+        "NAICS Code": str(rng.randint(111110, 928120)),
+        "PSC Code": f"R{rng.randint(400, 799)}",
+        "Last Modified Date": f"{year + rng.randint(0, 4)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 00:00:00",
+    }
@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from synthetic import synthetic_award
+
+# Local stand-in for POST /api/v2/search/spending_by_award/.
+#
+# Responses come from a recordings directory when one matches the request, otherwise they
+# are generated deterministically (same request -> same awards). Latency, 502s and
+# timeouts are injected at configurable rates to mimic the real API under load.
+#
+#   python usaspending_stub.py --port 8001 --latency 0.2 --error-rate 0.05
+#   USA_SPENDING_API_URL=http://127.0.0.1:8001/api/v2/search/spending_by_award/ python ../data_pp_yrly.py
+
+STUB_PATH = "/api/v2/search/spending_by_award/"
+
+
+class StubConfig:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, timeout_rate=0.0, timeout_delay=35.0,
+                 records_per_month=5000, record_dir=None, record_from=None, seed=None):
+        self.latency = latency  # Seconds added to every response
+        self.jitter = jitter  # Extra uniform random latency
+        self.error_rate = error_rate  # Share of requests answered with a 502
+        self.timeout_rate = timeout_rate  # Share of requests that stall past the client timeout
+        self.timeout_delay = timeout_delay
+        self.records_per_month = records_per_month  # Synthetic cursor length; later pages come back short/empty
+        self.record_dir = record_dir  # Directory of recorded responses
+        self.record_from = record_from  # Real API URL to proxy and record misses from
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "timeouts": 0, "recorded": 0}
+
+
+def recording_name(params):
+    """File name a request is recorded under."""
+    period = params["filters"]["time_period"][0]
+    sort = params.get("sort", "default").replace(" ", "_")
+    return f"{period['start_date']}_{period['end_date']}_p{params['page']}_l{params['limit']}_{sort}.json"
+
+
+def synthetic_response(params, records_per_month):
+    period = params["filters"]["time_period"][0]
+    year, month = int(period["start_date"][:4]), int(period["start_date"][5:7])
+    page, limit = params["page"], params["limit"]
+    first = (page - 1) * limit
+    last = min(first + limit, records_per_month)
+
+    results = [synthetic_award(index, year, month, prefix="STUB") for index in range(first, last)]
+    if params.get("sort") == "Last Modified Date":
+        # Keep the cursor globally ordered: newest-modified awards come first across pages
+        results = [
+            dict(award, **{"Last Modified Date": f"{9999 - index:04d}-01-01 00:00:00"})
+            for index, award in zip(range(first, last), results)
+        ]
+    return {
+        "results": results,
+        "page_metadata": {"page": page, "hasNext": last < records_per_month}
+    }
+
+
+def make_handler(config):
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            params = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            with config.lock:
+                config.stats["requests"] += 1
+                roll = config.random.random()
+                delay = config.latency + config.random.uniform(0, config.jitter)
+
+            if roll < config.timeout_rate:
+                with config.lock:
+                    config.stats["timeouts"] += 1
+                time.sleep(config.timeout_delay)
+                return
+            time.sleep(delay)
+            if roll < config.timeout_rate + config.error_rate:
+                with config.lock:
+                    config.stats["errors"] += 1
+                self.send_json(502, {"detail": "Bad Gateway"})
+                return
+
+            self.send_json(200, self.load_response(params))
+
+        def load_response(self, params):
+            if config.record_dir:
+                path = os.path.join(config.record_dir, recording_name(params))
+                if os.path.exists(path):
+                    with open(path) as f:
+                        return json.load(f)
+                if config.record_from:
+                    request = urllib.request.Request(
+                        config.record_from, data=json.dumps(params).encode(),
+                        headers={"Content-Type": "application/json"}
+                    )
+                    with urllib.request.urlopen(request, timeout=60) as response:
+                        payload = json.load(response)
+                    with open(path, "w") as f:
+                        json.dump(payload, f)
+                    with config.lock:
+                        config.stats["recorded"] += 1
+                    return payload
+            return synthetic_response(params, config.records_per_month)
+
+    return StubHandler
+
+
+def start_stub(config, host="127.0.0.1", port=0):
+    """Starts the stub in a background thread; returns (server, api_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}{STUB_PATH}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded or synthetic spending_by_award responses.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--records-per-month", type=int, default=5000)
+    parser.add_argument("--record-dir", help="Serve recorded responses from this directory")
+    parser.add_argument("--record-from", help="Proxy misses to this API URL and record them into --record-dir")
+    args = parser.parse_args()
+
+    if args.record_dir:
+        os.makedirs(args.record_dir, exist_ok=True)
+    config = StubConfig(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, timeout_rate=args.timeout_rate,
+        records_per_month=args.records_per_month, record_dir=args.record_dir, record_from=args.record_from
+    )
+    server, api_url = start_stub(config, args.host, args.port)
+    print(f"Stub serving {api_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"Stub stats: {config.stats}")
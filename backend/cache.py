@@ -0,0 +1,120 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import text
+from database import async_engine
+
+# Response cache for the analytics routes. Entries are keyed on path + query string and
+# tagged with the data generation that ingestion bumps on every write (database.py), so
+# they are invalidated as soon as new data lands. The generation itself is re-read at most
+# once per GENERATION_POLL_SECONDS, so repeat loads in between never touch Postgres.
+
+CACHED_PREFIX = "/api/contracts/"
+CACHE_MAX_ENTRIES = 512
+CACHE_TTL_SECONDS = 3600
+GENERATION_POLL_SECONDS = 5.0
+# Response headers stored with the body and replayed on hits
+PRESERVED_HEADERS = ("x-next-cursor",)
+
+
+class CacheEntry:
+    def __init__(self, generation, body, media_type, expires, headers=None):
+        self.generation = generation
+        self.body = body
+        self.media_type = media_type
+        self.headers = headers or {}
+        self.expires = expires
+        self.etag = f'"{generation}-{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+class ResponseCache:
+    """LRU + TTL cache of rendered responses, invalidated by the data generation counter."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, poll_seconds=GENERATION_POLL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.poll_seconds = poll_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation = None
+        self.checked_at = 0.0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "not_modified": 0}
+
+    async def read_generation(self):
+        async with async_engine.connect() as conn:
+            return await conn.scalar(text("SELECT generation FROM data_generation WHERE id = 1")) or 0
+
+    async def current_generation(self):
+        if self.generation is None or time.monotonic() - self.checked_at >= self.poll_seconds:
+            generation = await self.read_generation()
+            with self.lock:
+                if generation != self.generation:
+                    self.entries.clear()  # Everything cached belongs to an older generation
+                self.generation = generation
+                self.checked_at = time.monotonic()
+        return self.generation
+
+    def get(self, key, generation):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.generation != generation or entry.expires < time.monotonic():
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, key, generation, body, media_type, headers=None):
+        entry = CacheEntry(generation, body, media_type, time.monotonic() + self.ttl, headers)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def cache_key(request):
+    return request.url.path, tuple(sorted(request.query_params.multi_items()))
+
+
+def etag_matches(request, etag):
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+async def cache_analytics_responses(request: Request, call_next):
+    """HTTP middleware: serves cached GET /api/contracts/* responses with ETags and 304s."""
+    if request.method != "GET" or not request.url.path.startswith(CACHED_PREFIX):
+        return await call_next(request)
+
+    generation = await response_cache.current_generation()
+    key = cache_key(request)
+    entry = response_cache.get(key, generation)
+    status = "HIT"
+
+    if entry is None:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        preserved = {name: response.headers[name] for name in PRESERVED_HEADERS if name in response.headers}
+        entry = response_cache.put(key, generation, body, response.headers.get("content-type"), preserved)
+        status = "MISS"
+
+    headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": "no-cache", "X-Cache": status}
+    if etag_matches(request, entry.etag):
+        response_cache.stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
@@ -0,0 +1,273 @@
+import os
+import time
+import asyncio
+import threading
+import numpy as np
+from sqlalchemy import text
+from database import engine
+from analytics import ContractFilters, decode_cursor, encode_cursor, RANKED_COLUMNS, DEFAULT_PAGE_SIZE
+from rollups import TREND_START_YEAR, TREND_END_YEAR
+
+# Optional in-memory copy of the columns the analytics routes aggregate, held as NumPy arrays
+# with agency/place/category dictionary-encoded to integer codes. Reads never touch Postgres:
+# a background task polls the data generation and appends rows with ids above the last one
+# loaded. Enable with COLUMNAR_ENGINE=1; check it against SQL with benchmarks/columnar_parity.py.
+
+COLUMNAR_ENABLED = os.getenv("COLUMNAR_ENGINE", "0") == "1"
+REFRESH_SECONDS = float(os.getenv("COLUMNAR_REFRESH_SECONDS", "5"))
+LOAD_CHUNK_SIZE = 50000
+MEMO_MAX_ENTRIES = 1024  # Aggregates memoized per snapshot, keyed on query and filters
+
+# Filter parameter -> encoded column; the engine answers filters on these plus the year range
+ENCODED_COLUMNS = {"agency": "agency", "place": "place_of_performance", "category": "contract_category"}
+
+LOAD_QUERY = text("""
+    SELECT id, start_date, award_amount, agency, place_of_performance, contract_category
+    FROM contracts
+    WHERE id > :after_id
+    ORDER BY id
+""")
+
+# Rollup totals are kept exact by triggers; a mismatch means rows were updated or deleted
+TOTALS_QUERY = text("""
+    SELECT COALESCE(SUM(contract_count), 0), COALESCE(SUM(total_award), 0) FROM rollup_agencies
+""")
+
+
+class Dictionary:
+    """Append-only value <-> code mapping, so codes in older snapshots stay valid."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, values):
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            codes[i] = code
+        return codes
+
+
+class ColumnSnapshot:
+    """Immutable set of column arrays; refreshes build a new one and swap it in."""
+
+    def __init__(self, ids, years, months, awards, codes):
+        self.ids = ids
+        self.years = years  # 0 where start_date is NULL
+        self.months = months
+        self.awards = awards
+        self.codes = codes  # Column name -> int32 codes into ColumnarStore.dictionaries
+        self.memo = {}
+
+    @property
+    def max_id(self):
+        return int(self.ids[-1]) if len(self.ids) else 0
+
+    def extend(self, other):
+        return ColumnSnapshot(
+            np.concatenate([self.ids, other.ids]),
+            np.concatenate([self.years, other.years]),
+            np.concatenate([self.months, other.months]),
+            np.concatenate([self.awards, other.awards]),
+            {name: np.concatenate([codes, other.codes[name]]) for name, codes in self.codes.items()},
+        )
+
+
+class ColumnarStore:
+    def __init__(self):
+        self.dictionaries = {column: Dictionary() for column in ENCODED_COLUMNS.values()}
+        self.snapshot = None
+        self.generation = None
+        self.lock = threading.Lock()  # Serializes refreshes; reads use whichever snapshot is current
+        self.stats = {"rows": 0, "full_loads": 0, "incremental_loads": 0, "last_refresh_ms": 0.0}
+
+    @property
+    def ready(self):
+        return self.snapshot is not None
+
+    # ========================== LOADING ========================== #
+
+    def fetch_rows(self, conn, after_id):
+        """Reads contracts with id > after_id into a ColumnSnapshot."""
+        ids, years, months, awards = [], [], [], []
+        values = {column: [] for column in self.dictionaries}
+        result = conn.execution_options(stream_results=True).execute(LOAD_QUERY, {"after_id": after_id})
+        for rows in result.partitions(LOAD_CHUNK_SIZE):
+            for row in rows:
+                ids.append(row.id)
+                years.append(row.start_date.year if row.start_date else 0)
+                months.append(row.start_date.month if row.start_date else 0)
+                awards.append(row.award_amount)
+                for column in values:
+                    values[column].append(getattr(row, column))
+        return ColumnSnapshot(
+            np.array(ids, dtype=np.int64),
+            np.array(years, dtype=np.int16),
+            np.array(months, dtype=np.int8),
+            np.array(awards, dtype=np.float64),
+            {column: self.dictionaries[column].encode(column_values) for column, column_values in values.items()},
+        )
+
+    def refresh(self, full=False):
+        """Appends new rows, or reloads everything when stored rows changed underneath us."""
+        with self.lock:
+            started = time.perf_counter()
+            with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+                generation = conn.execute(text("SELECT generation FROM data_generation WHERE id = 1")).scalar()
+                if self.snapshot is None or full:
+                    snapshot = self.fetch_rows(conn, 0)
+                    self.stats["full_loads"] += 1
+                else:
+                    snapshot = self.snapshot.extend(self.fetch_rows(conn, self.snapshot.max_id))
+                    self.stats["incremental_loads"] += 1
+                count, total = conn.execute(TOTALS_QUERY).one()
+                if count != len(snapshot.ids) or not np.isclose(total, snapshot.awards.sum(), rtol=1e-9):
+                    snapshot = self.fetch_rows(conn, 0)
+                    self.stats["full_loads"] += 1
+            self.snapshot = snapshot
+            self.generation = generation
+            self.stats["rows"] = len(snapshot.ids)
+            self.stats["last_refresh_ms"] = (time.perf_counter() - started) * 1000
+
+    def refresh_if_changed(self):
+        with engine.connect() as conn:
+            generation = conn.execute(text("SELECT generation FROM data_generation WHERE id = 1")).scalar()
+        if generation != self.generation:
+            self.refresh()
+
+    async def run_refresher(self):
+        """Background task: initial load, then incremental refreshes when the generation moves."""
+        while True:
+            try:
+                loaded = self.ready
+                await asyncio.to_thread(self.refresh_if_changed)
+                if not loaded:
+                    print(f"Columnar engine loaded {self.stats['rows']} contracts in {self.stats['last_refresh_ms']:.0f} ms")
+            except Exception as e:
+                print(f"Columnar refresh failed: {e}")
+            await asyncio.sleep(REFRESH_SECONDS)
+
+    # ========================== QUERIES ========================== #
+
+    def memoized(self, name, filters, compute, *args, snapshot=None):
+        """Result of compute(snapshot, filters, *args), computed once per snapshot (default: the current one)."""
+        snapshot = snapshot or self.snapshot
+        key = (name, filters.start_year, filters.end_year, tuple(sorted(filters.values.items())), args)
+        result = snapshot.memo.get(key)
+        if result is None:
+            if len(snapshot.memo) >= MEMO_MAX_ENTRIES:
+                snapshot.memo.clear()
+            result = snapshot.memo[key] = compute(snapshot, filters, *args)
+        return result
+
+    def supports(self, filters):
+        return self.ready and all(name in ENCODED_COLUMNS for name in filters.values)
+
+    def mask(self, snapshot, filters):
+        mask = np.ones(len(snapshot.ids), dtype=bool)
+        if filters.start_year is not None:
+            mask &= snapshot.years >= filters.start_year
+        if filters.end_year is not None:
+            mask &= (snapshot.years <= filters.end_year) & (snapshot.years > 0)
+        for name, value in filters.values.items():
+            column = ENCODED_COLUMNS[name]
+            code = self.dictionaries[column].codes.get(value)
+            if code is None:
+                return np.zeros(len(snapshot.ids), dtype=bool)
+            mask &= snapshot.codes[column] == code
+        return mask
+
+    def group(self, snapshot, column, mask):
+        """(values, counts, totals) per dictionary code of `column` over the masked rows."""
+        values = self.dictionaries[column].values
+        codes = snapshot.codes[column][mask]
+        counts = np.bincount(codes, minlength=len(values))
+        totals = np.bincount(codes, weights=snapshot.awards[mask], minlength=len(values))
+        return values, counts, totals
+
+    def ranked_rows(self, snapshot, filters, column):
+        values, counts, totals = self.group(snapshot, column, self.mask(snapshot, filters))
+        rows = [
+            (int(counts[code]), values[code], float(totals[code]))
+            for code in np.flatnonzero(counts) if values[code] is not None
+        ]
+        rows.sort(key=lambda row: (-row[0], row[1]))
+        return rows
+
+    def ranked(self, group_by, filters, limit=DEFAULT_PAGE_SIZE, cursor=None, snapshot=None):
+        """Same rows and cursors as analytics.ranked."""
+        column = RANKED_COLUMNS[group_by]
+        rows = self.memoized("ranked", filters, self.ranked_rows, column, snapshot=snapshot)
+        if cursor:
+            after_count, after_key = decode_cursor(cursor)
+            rows = [row for row in rows if row[0] < after_count or (row[0] == after_count and row[1] > after_key)]
+        page = [{column: key, "contract_count": count, "total_award": total} for count, key, total in rows[:limit]]
+        next_cursor = encode_cursor(page[-1]["contract_count"], page[-1][column]) if len(rows) > limit else None
+        return page, next_cursor
+
+    def dashboard(self, filters, limit=DEFAULT_PAGE_SIZE):
+        """Same payload as analytics.dashboard."""
+        return self.memoized("dashboard", filters, self.compute_dashboard, limit)
+
+    def compute_dashboard(self, snapshot, filters, limit):
+        # Every facet from the same snapshot, even if a refresh swaps in a new one meanwhile
+        mask = self.mask(snapshot, filters)
+        return {
+            "agency_funding": self.ranked("agency", filters, limit, snapshot=snapshot)[0],
+            "place_performance": self.ranked("place", filters, limit, snapshot=snapshot)[0],
+            "category_breakdown": self.category_breakdown(filters, snapshot=snapshot),
+            "totals": {"contract_count": int(mask.sum()), "total_award": float(snapshot.awards[mask].sum())},
+        }
+
+    def category_breakdown(self, filters, snapshot=None):
+        return self.memoized("categories", filters, self.compute_category_breakdown, snapshot=snapshot)
+
+    def compute_category_breakdown(self, snapshot, filters):
+        values, counts, _ = self.group(snapshot, "contract_category", self.mask(snapshot, filters))
+        total = counts.sum()
+        return [
+            {"contract_category": values[code], "contract_percentage": counts[code] * 100.0 / total}
+            for code in np.flatnonzero(counts)
+        ]
+
+    def monthly_trends(self, filters):
+        if filters.start_year is None and filters.end_year is None:
+            filters = ContractFilters(TREND_START_YEAR, TREND_END_YEAR, **filters.values)
+        return self.memoized("trends", filters, self.compute_monthly_trends)
+
+    def compute_monthly_trends(self, snapshot, filters):
+        mask = self.mask(snapshot, filters) & (snapshot.months > 0)
+        months = snapshot.months[mask]
+        order = np.argsort(months, kind="stable")
+        awards = snapshot.awards[mask][order]
+        counts = np.bincount(months, minlength=13)
+        trends = []
+        # Awards sorted by month, split into one chunk per month (chunk 0 is the empty NULL-date group)
+        for month, chunk in zip(range(1, 13), np.split(awards, np.cumsum(counts[:13])[:-1])[1:]):
+            if len(chunk):
+                trends.append({"month": month, "contract_count": len(chunk), "median_award_amount": float(np.median(chunk))})
+        return trends
+
+    def period_counts(self, filters):
+        return self.memoized("counts", filters, self.compute_period_counts)
+
+    def compute_period_counts(self, snapshot, filters):
+        mask = self.mask(snapshot, filters) & (snapshot.years > 0)
+        periods = snapshot.years[mask].astype(np.int32) * 12 + snapshot.months[mask] - 1
+        if not len(periods):
+            return []
+        first = periods.min()
+        counts = np.bincount(periods - first)
+        totals = np.bincount(periods - first, weights=snapshot.awards[mask])
+        return [
+            {"year": int((first + offset) // 12), "month": int((first + offset) % 12 + 1),
+             "contract_count": int(counts[offset]), "total_award": float(totals[offset])}
+            for offset in np.flatnonzero(counts)
+        ]
+
+
+columnar_store = ColumnarStore()
@@ -0,0 +1,29 @@
+from sqlalchemy import text
+from database import SessionLocal
+
+# Reads from contract_counts, which triggers on contracts keep current in the same
+# transaction as every insert, update and delete (see database.py).
+
+PERIOD_COUNTS_QUERY = text("""
+    SELECT year, month, contract_count, total_award
+    FROM contract_counts
+    WHERE year BETWEEN :start_year AND :end_year AND contract_count > 0
+    ORDER BY year, month
+""")
+
+
+def get_contract_count(year, month=None):
+    """Number of stored contracts whose start_date falls in the given year (and month)."""
+    query = "SELECT COALESCE(SUM(contract_count), 0) FROM contract_counts WHERE year = :year"
+    params = {"year": year}
+    if month is not None:
+        query += " AND month = :month"
+        params["month"] = month
+    with SessionLocal() as session:
+        return session.execute(text(query), params).scalar()
+
+
+def get_period_counts(conn, start_year, end_year):
+    """Per-(year, month) contract counts and award totals as a list of dicts."""
+    result = conn.execute(PERIOD_COUNTS_QUERY, {"start_year": start_year, "end_year": end_year})
+    return [dict(row._mapping) for row in result]
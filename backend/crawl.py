@@ -0,0 +1,137 @@
+import asyncio
+from contextlib import aclosing
+from sqlalchemy.dialects.postgresql import insert
+from database import SessionLocal, CrawlCheckpoint
+from fetcher import AsyncFetcher, PAGE_LIMIT
+from ingest import write_batch
+from rollups import refresh_rollups
+
+# The API serves at most 10,000 results per query (100 pages of 100)
+MAX_PAGES_PER_MONTH = 100
+
+
+class CrawlPlanner:
+    """Walks (year, month, page) cursors in order instead of sampling random pages.
+
+    Pages already recorded in crawl_checkpoints are never planned again, and a month
+    stops being planned once one of its pages comes back short (the cursor is exhausted).
+    """
+
+    def __init__(self, year, max_pages=MAX_PAGES_PER_MONTH):
+        self.year = year
+        self.max_pages = max_pages
+        self.done = {month: set() for month in range(1, 13)}
+        self.exhausted = set()
+        self.failed = set()  # (month, page) that failed in this run; retried on the next run
+        self.load()
+
+    def load(self):
+        """Loads stored progress so a restarted crawl resumes where it stopped."""
+        with SessionLocal() as session:
+            rows = (
+                session.query(CrawlCheckpoint.month, CrawlCheckpoint.page, CrawlCheckpoint.exhausted)
+                .filter(CrawlCheckpoint.year == self.year)
+                .all()
+            )
+        for month, page, exhausted in rows:
+            self.done[month].add(page)
+            if exhausted:
+                self.exhausted.add(month)
+
+    def pending_pages(self, month):
+        """Yields the month's pages that are neither stored nor failed, in page order."""
+        if month in self.exhausted:
+            return
+        for page in range(1, self.max_pages + 1):
+            if page not in self.done[month] and (month, page) not in self.failed:
+                yield page
+
+    def plan_round(self, needed_contracts, limit=PAGE_LIMIT):
+        """Plans enough pages to cover needed_contracts, taken round-robin across months."""
+        page_count = -(-needed_contracts // limit)  # Ceiling division
+        cursors = {month: self.pending_pages(month) for month in range(1, 13)}
+        jobs = []
+        while cursors and len(jobs) < page_count:
+            for month in list(cursors):
+                page = next(cursors[month], None)
+                if page is None:
+                    del cursors[month]
+                    continue
+                jobs.append((self.year, month, page))
+                if len(jobs) == page_count:
+                    break
+        return jobs
+
+    def mark_done(self, month, page, exhausted):
+        self.done[month].add(page)
+        if exhausted:
+            self.exhausted.add(month)
+
+
+def store_page(year, month, page, contracts, limit=PAGE_LIMIT):
+    """Saves a page's contracts and its checkpoint in one transaction.
+
+    Returns (counts, exhausted), or None if the write failed.
+    """
+    exhausted = len(contracts) < limit
+    with SessionLocal() as session:
+        try:
+            counts = write_batch(session, contracts)
+            session.execute(
+                insert(CrawlCheckpoint)
+                .values(year=year, month=month, page=page, record_count=len(contracts), exhausted=exhausted)
+                .on_conflict_do_nothing()
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Error saving {year}-{month:02d} page {page}: {e}")
+            return None
+    return counts, exhausted
+
+
+async def crawl_year_async(year, target_contracts, existing_count, limit=PAGE_LIMIT, **fetcher_options):
+    """Crawls a year's pages until about target_contracts are stored or every month is exhausted.
+
+    Returns the number of contracts inserted by this run.
+    """
+    planner = CrawlPlanner(year)
+    inserted = 0
+
+    async with AsyncFetcher(**fetcher_options) as fetcher:
+        while existing_count + inserted < target_contracts:
+            jobs = planner.plan_round(target_contracts - existing_count - inserted, limit)
+            if not jobs:
+                print(f"All months of {year} are exhausted or failed in this run.")
+                break
+
+            print(f"Fetching {len(jobs)} pages for {year}...")
+            async with aclosing(fetcher.fetch_many(jobs, limit=limit)) as results:
+                async for (_, month, page), contracts in results:
+                    if contracts is None:
+                        planner.failed.add((month, page))
+                        continue
+
+                    stored = await asyncio.to_thread(store_page, year, month, page, contracts, limit)
+                    if stored is None:
+                        planner.failed.add((month, page))
+                        continue
+
+                    counts, exhausted = stored
+                    planner.mark_done(month, page, exhausted)
+                    inserted += counts["inserted"]
+                    print(f"✅ {year}-{month:02d} page {page}: {counts['inserted']} new, "
+                          f"{counts['duplicates']} duplicates{' (month exhausted)' if exhausted else ''}")
+
+                    if existing_count + inserted >= target_contracts:
+                        break  # Remaining in-flight pages are cancelled and stay unrecorded
+
+    await asyncio.to_thread(refresh_rollups)  # Once per run: medians re-sort every dirty month
+    print(f"Inserted {inserted} contracts for {year} in {fetcher.stats['requests']} requests "
+          f"({fetcher.stats['retries']} retries, {fetcher.stats['failures']} failures)")
+    return inserted
+
+
+def crawl_year(year, target_contracts, existing_count, limit=PAGE_LIMIT, **fetcher_options):
+    """Synchronous wrapper around crawl_year_async."""
+    return asyncio.run(crawl_year_async(year, target_contracts, existing_count, limit=limit, **fetcher_options))
@@ -1,12 +1,15 @@
 from dotenv import load_dotenv
 import os
+import math
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date
+from sqlalchemy import create_engine, text, Column, Integer, BigInteger, String, Float, Date, Boolean, DateTime, func, event, DDL
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 import psycopg2
 
 # Create the database if it doesn't exist
@@ -24,9 +27,30 @@ def create_database():
 
 create_database()
 
+# Connection pools, sized separately. The async pool serves the API routes; the sync pool serves
+# scripts and, inside an API process, the export route and the lookup/columnar refreshers. One API
+# process opens at most DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_SYNC_POOL_SIZE + DB_SYNC_MAX_OVERFLOW
+# connections (30 by default); multiply by the worker count to size max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_SYNC_POOL_SIZE = int(os.getenv("DB_SYNC_POOL_SIZE", 5))
+DB_SYNC_MAX_OVERFLOW = int(os.getenv("DB_SYNC_MAX_OVERFLOW", 5))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # Reconnect before server-side idle timeouts
+
+POOL_OPTIONS = {
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": True,
+}
+
 # Set up DB engine & session
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, pool_size=DB_SYNC_POOL_SIZE, max_overflow=DB_SYNC_MAX_OVERFLOW, **POOL_OPTIONS)
 SessionLocal = sessionmaker(bind=engine)
+
+# Async engine (asyncpg) for the FastAPI routes
+ASYNC_DATABASE_URL = make_url(DATABASE_URL).set(drivername="postgresql+asyncpg")
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, **POOL_OPTIONS)
 Base = declarative_base()
 
 # Define Contracts Table
@@ -34,7 +58,7 @@ class Contract(Base):
     __tablename__ = "contracts"
 
     id = Column(Integer, primary_key=True, index=True)
-    contract_id = Column(String(50), unique=True, index=True, nullable=False)
+    contract_id = Column(String(50), unique=True, index=True, nullable=False)  # Via contract_keys once partitioned (migrations.py)
     vendor = Column(String(255), nullable=True)
     award_amount = Column(Float, nullable=False)
     total_outlays = Column(Float, nullable=True)  
@@ -50,5 +74,277 @@ class Contract(Base):
     naics_code = Column(String(50), nullable=True)  
     psc_code = Column(String(50), nullable=True)
 
+# Crawl progress: one row per (year, month, page) already fetched and stored
+class CrawlCheckpoint(Base):
+    __tablename__ = "crawl_checkpoints"
+
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    page = Column(Integer, primary_key=True)
+    record_count = Column(Integer, nullable=False)
+    exhausted = Column(Boolean, nullable=False, default=False)  # Last page of this (year, month)
+    fetched_at = Column(DateTime, nullable=False, server_default=func.now())
+
+# Incremental refresh: newest "Last Modified Date" seen per (year, month)
+class IngestWatermark(Base):
+    __tablename__ = "ingest_watermarks"
+
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    last_modified = Column(String(32), nullable=False)  # As returned by the API, compared lexically
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+
+# Per-(year, month) totals of contracts by start_date, kept current by triggers on contracts
+class ContractCount(Base):
+    __tablename__ = "contract_counts"
+
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    contract_count = Column(Integer, nullable=False, default=0)
+    total_award = Column(Float, nullable=False, default=0)
+
+# Statement-level triggers with transition tables: one aggregated upsert per statement, in the
+# writer's transaction, whichever path wrote the rows (ORM, bulk insert, upsert, COPY merge, DELETE)
+CONTRACT_COUNTS_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION contract_counts_apply() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO contract_counts (year, month, contract_count, total_award)
+            SELECT EXTRACT(YEAR FROM start_date)::int, EXTRACT(MONTH FROM start_date)::int,
+                   COUNT(*), COALESCE(SUM(award_amount), 0)
+            FROM new_rows WHERE start_date IS NOT NULL GROUP BY 1, 2
+            ON CONFLICT (year, month) DO UPDATE SET
+                contract_count = contract_counts.contract_count + EXCLUDED.contract_count,
+                total_award = contract_counts.total_award + EXCLUDED.total_award;
+        END IF;
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            INSERT INTO contract_counts (year, month, contract_count, total_award)
+            SELECT EXTRACT(YEAR FROM start_date)::int, EXTRACT(MONTH FROM start_date)::int,
+                   -COUNT(*), -COALESCE(SUM(award_amount), 0)
+            FROM old_rows WHERE start_date IS NOT NULL GROUP BY 1, 2
+            ON CONFLICT (year, month) DO UPDATE SET
+                contract_count = contract_counts.contract_count + EXCLUDED.contract_count,
+                total_award = contract_counts.total_award + EXCLUDED.total_award;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER contract_counts_insert AFTER INSERT ON contracts
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION contract_counts_apply()
+    """,
+    """
+    CREATE TRIGGER contract_counts_update AFTER UPDATE ON contracts
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION contract_counts_apply()
+    """,
+    """
+    CREATE TRIGGER contract_counts_delete AFTER DELETE ON contracts
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION contract_counts_apply()
+    """,
+    # Backfill from rows stored before the counters existed
+    """
+    INSERT INTO contract_counts (year, month, contract_count, total_award)
+    SELECT EXTRACT(YEAR FROM start_date)::int, EXTRACT(MONTH FROM start_date)::int,
+           COUNT(*), COALESCE(SUM(award_amount), 0)
+    FROM contracts WHERE start_date IS NOT NULL GROUP BY 1, 2
+    """,
+]
+
+# Created after contracts, so the triggers and backfill run once, when contract_counts is new
+ContractCount.__table__.add_is_dependent_on(Contract.__table__)
+for statement in CONTRACT_COUNTS_DDL:
+    event.listen(ContractCount.__table__, "after_create", DDL(statement))
+
+# Dashboard rollups: the analytics endpoints read these instead of grouping contracts per request
+class RollupPlace(Base):
+    __tablename__ = "rollup_places"
+
+    place_of_performance = Column(String(100), primary_key=True)
+    contract_count = Column(Integer, nullable=False, default=0)
+    total_award = Column(Float, nullable=False, default=0)
+
+class RollupAgency(Base):
+    __tablename__ = "rollup_agencies"
+
+    agency = Column(String(255), primary_key=True)
+    contract_count = Column(Integer, nullable=False, default=0)
+    total_award = Column(Float, nullable=False, default=0)
+
+class RollupCategory(Base):
+    __tablename__ = "rollup_categories"
+
+    contract_category = Column(String(50), primary_key=True)  # '' stands for NULL
+    contract_count = Column(Integer, nullable=False, default=0)
+
+# Median award per calendar month over the dashboard's trend years; recomputed for dirty months only
+class RollupMonthMedian(Base):
+    __tablename__ = "rollup_month_medians"
+
+    month = Column(Integer, primary_key=True)
+    median_award_amount = Column(Float, nullable=True)
+
+class RollupDirtyMonth(Base):
+    __tablename__ = "rollup_dirty_months"
+
+    month = Column(Integer, primary_key=True)
+
+ROLLUP_DELTA_SQL = """
+    INSERT INTO rollup_places (place_of_performance, contract_count, total_award)
+    SELECT place_of_performance, {sign}COUNT(*), {sign}COALESCE(SUM(award_amount), 0)
+    FROM {rows} WHERE place_of_performance IS NOT NULL GROUP BY 1
+    ON CONFLICT (place_of_performance) DO UPDATE SET
+        contract_count = rollup_places.contract_count + EXCLUDED.contract_count,
+        total_award = rollup_places.total_award + EXCLUDED.total_award;
+    INSERT INTO rollup_agencies (agency, contract_count, total_award)
+    SELECT agency, {sign}COUNT(*), {sign}COALESCE(SUM(award_amount), 0)
+    FROM {rows} WHERE agency IS NOT NULL GROUP BY 1
+    ON CONFLICT (agency) DO UPDATE SET
+        contract_count = rollup_agencies.contract_count + EXCLUDED.contract_count,
+        total_award = rollup_agencies.total_award + EXCLUDED.total_award;
+    INSERT INTO rollup_categories (contract_category, contract_count)
+    SELECT COALESCE(contract_category, ''), {sign}COUNT(*) FROM {rows} GROUP BY 1
+    ON CONFLICT (contract_category) DO UPDATE SET
+        contract_count = rollup_categories.contract_count + EXCLUDED.contract_count;
+    INSERT INTO rollup_dirty_months (month)
+    SELECT DISTINCT EXTRACT(MONTH FROM start_date)::int FROM {rows} WHERE start_date IS NOT NULL
+    ON CONFLICT DO NOTHING;
+"""
+
+# Same statement-level trigger pattern as contract_counts
+ROLLUPS_DDL = [
+    f"""
+    CREATE OR REPLACE FUNCTION contract_rollups_apply() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            {ROLLUP_DELTA_SQL.format(sign="", rows="new_rows")}
+        END IF;
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            {ROLLUP_DELTA_SQL.format(sign="-", rows="old_rows")}
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER contract_rollups_insert AFTER INSERT ON contracts
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION contract_rollups_apply()
+    """,
+    """
+    CREATE TRIGGER contract_rollups_update AFTER UPDATE ON contracts
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION contract_rollups_apply()
+    """,
+    """
+    CREATE TRIGGER contract_rollups_delete AFTER DELETE ON contracts
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION contract_rollups_apply()
+    """,
+    # Backfill from rows stored before the rollups existed; medians follow on the first refresh
+    ROLLUP_DELTA_SQL.format(sign="", rows="contracts"),
+]
+
+# Created last, so every rollup table exists when the triggers and backfill run
+RollupDirtyMonth.__table__.add_is_dependent_on(Contract.__table__)
+for rollup in (RollupPlace, RollupAgency, RollupCategory, RollupMonthMedian):
+    RollupDirtyMonth.__table__.add_is_dependent_on(rollup.__table__)
+for statement in ROLLUPS_DDL:
+    event.listen(RollupDirtyMonth.__table__, "after_create", DDL(statement))
+
+# Award-amount sketches: per (dimension, value, year, month), counts of awards in log-spaced buckets
+# (bucket k holds |amount| in (gamma^(k-1), gamma^k]). Buckets from any set of months and years
+# merge by adding counts, and a percentile read off them is within SKETCH_RELATIVE_ACCURACY of the
+# true value (see sketches.py). dimension '' covers all contracts; 'agency', 'place' and 'category'
+# slice by that column ('' stands for a NULL category). Rows without a start_date use year/month 0.
+SKETCH_RELATIVE_ACCURACY = 0.01
+SKETCH_LOG_GAMMA = math.log((1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY))
+
+class AwardSketch(Base):
+    __tablename__ = "award_sketches"
+
+    dimension = Column(String(16), primary_key=True)
+    value = Column(String(255), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    sign = Column(Integer, primary_key=True)  # -1, 0 or 1: sign of the award amount
+    bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+SKETCH_DELTA_SQL = f"""
+    INSERT INTO award_sketches (dimension, value, year, month, sign, bucket, count)
+    SELECT slice.dimension, slice.value,
+           COALESCE(EXTRACT(YEAR FROM start_date)::int, 0), COALESCE(EXTRACT(MONTH FROM start_date)::int, 0),
+           SIGN(award_amount)::int,
+           CASE WHEN award_amount = 0 THEN 0 ELSE CEIL(LN(ABS(award_amount)) / {SKETCH_LOG_GAMMA!r})::int END,
+           {{sign}}COUNT(*)
+    FROM {{rows}}
+    CROSS JOIN LATERAL (VALUES
+        ('', ''), ('agency', agency), ('place', place_of_performance), ('category', COALESCE(contract_category, ''))
+    ) AS slice (dimension, value)
+    WHERE slice.value IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5, 6
+    ON CONFLICT (dimension, value, year, month, sign, bucket) DO UPDATE SET
+        count = award_sketches.count + EXCLUDED.count;
+"""
+
+# Same statement-level trigger pattern as contract_counts
+AWARD_SKETCHES_DDL = [
+    f"""
+    CREATE OR REPLACE FUNCTION award_sketches_apply() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            {SKETCH_DELTA_SQL.format(sign="", rows="new_rows")}
+        END IF;
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            {SKETCH_DELTA_SQL.format(sign="-", rows="old_rows")}
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER award_sketches_insert AFTER INSERT ON contracts
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION award_sketches_apply()
+    """,
+    """
+    CREATE TRIGGER award_sketches_update AFTER UPDATE ON contracts
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION award_sketches_apply()
+    """,
+    """
+    CREATE TRIGGER award_sketches_delete AFTER DELETE ON contracts
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION award_sketches_apply()
+    """,
+    # Backfill from rows stored before the sketches existed
+    SKETCH_DELTA_SQL.format(sign="", rows="contracts"),
+]
+
+AwardSketch.__table__.add_is_dependent_on(Contract.__table__)
+for statement in AWARD_SKETCHES_DDL:
+    event.listen(AwardSketch.__table__, "after_create", DDL(statement))
+
+# Contract volume forecast, precomputed when the forecast model is trained (forecasts.py);
+# replaced as a whole on every retrain
+class ContractForecast(Base):
+    __tablename__ = "contract_forecasts"
+
+    level = Column(String(8), primary_key=True)  # 'day' or 'month'
+    period = Column(Date, primary_key=True)  # The day, or the first day of the month
+    yhat = Column(Float, nullable=False)
+    yhat_lower = Column(Float, nullable=False)
+    yhat_upper = Column(Float, nullable=False)
+    is_forecast = Column(Boolean, nullable=False)  # Period extends past the last observed day
+    trained_at = Column(DateTime, nullable=False, server_default=func.now())
+
+# Single-row counter bumped by every ingestion write; API response caches are keyed on it
+class DataGeneration(Base):
+    __tablename__ = "data_generation"
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(BigInteger, nullable=False, default=0)
+
+event.listen(DataGeneration.__table__, "after_create", DDL("INSERT INTO data_generation (id, generation) VALUES (1, 0)"))
+
+# Executed in the same transaction as any write that changes what the API would return
+BUMP_GENERATION = text("UPDATE data_generation SET generation = generation + 1 WHERE id = 1")
+
 # Create Table
 Base.metadata.create_all(engine)
\ No newline at end of file
@@ -0,0 +1,175 @@
+import io
+import sys
+import csv
+import json
+import zlib
+import argparse
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from database import engine
+from analytics import ContractFilters, FILTER_COLUMNS
+from snapshot import SNAPSHOT_COLUMNS, ARROW_SCHEMA
+
+try:
+    import zstandard
+except ImportError:  # Optional: only needed for compression="zstd"
+    zstandard = None
+
+# Streaming export of (filtered) contracts as CSV, NDJSON or Parquet. Rows come from a
+# server-side cursor one chunk at a time and each chunk is encoded, compressed and handed
+# on before the next is read, so memory stays flat however many rows match.
+#
+#   python export.py --format csv --compression gzip --out contracts.csv.gz --start-year 2020
+#   GET /api/export/contracts?format=ndjson&compression=zstd&agency=...
+
+EXPORT_CHUNK_SIZE = 10000
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+COMPRESSIONS = {
+    "none": (None, ""),
+    "gzip": ("application/gzip", ".gz"),
+    "zstd": ("application/zstd", ".zst"),
+}
+
+
+def iter_chunks(filters, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields lists of contract rows matching `filters`, read through a server-side cursor."""
+    where, params = filters.where()
+    query = text(f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM contracts WHERE {where} ORDER BY id")
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query, params)
+        for rows in result.partitions():
+            yield rows
+
+
+# ========================== ENCODERS ========================== #
+
+def encode_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(SNAPSHOT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()  # Header only: nothing matched
+
+
+def encode_ndjson(chunks):
+    for rows in chunks:
+        yield "".join(json.dumps(dict(row._mapping), default=str) + "\n" for row in rows).encode()
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain()."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.parts.append(bytes(b))
+        self.position += len(b)
+        return len(b)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def encode_parquet(chunks):
+    # One row group per chunk; the footer is written when the writer closes
+    sink = ChunkSink()
+    with pq.ParquetWriter(sink, ARROW_SCHEMA, compression="zstd") as writer:
+        for rows in chunks:
+            writer.write_table(pa.Table.from_pylist([dict(row._mapping) for row in rows], schema=ARROW_SCHEMA))
+            yield sink.drain()
+    yield sink.drain()
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson, "parquet": encode_parquet}
+
+
+def compress(parts, compression):
+    if compression == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+        for part in parts:
+            yield compressor.compress(part)
+        yield compressor.flush()
+    elif compression == "zstd":
+        compressor = zstandard.ZstdCompressor().compressobj()
+        for part in parts:
+            yield compressor.compress(part)
+        yield compressor.flush()
+    else:
+        yield from parts
+
+
+def check_options(fmt, compression):
+    """Returns an error message for an unsupported format/compression pair, else None."""
+    if fmt not in FORMATS:
+        return f"Unknown format '{fmt}', expected one of {', '.join(FORMATS)}"
+    if compression not in COMPRESSIONS:
+        return f"Unknown compression '{compression}', expected one of {', '.join(COMPRESSIONS)}"
+    if fmt == "parquet" and compression != "none":
+        return "Parquet is already compressed column by column (zstd); use compression=none"
+    if compression == "zstd" and zstandard is None:
+        return "zstd compression needs the zstandard package"
+    return None
+
+
+def export_stream(filters, fmt="csv", compression="none", chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields the encoded (and compressed) export as byte chunks, skipping empty ones."""
+    parts = compress(ENCODERS[fmt](iter_chunks(filters, chunk_size)), compression)
+    return (part for part in parts if part)
+
+
+def export_filename(fmt, compression):
+    return f"contracts.{FORMATS[fmt][1]}{COMPRESSIONS[compression][1]}"
+
+
+def export_media_type(fmt, compression):
+    return COMPRESSIONS[compression][0] or FORMATS[fmt][0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream contracts to a CSV, NDJSON or Parquet file.")
+    parser.add_argument("--format", default="csv", choices=FORMATS)
+    parser.add_argument("--compression", default="none", choices=COMPRESSIONS)
+    parser.add_argument("--out", help="Output file (default: stdout)")
+    parser.add_argument("--start-year", type=int)
+    parser.add_argument("--end-year", type=int)
+    for name in FILTER_COLUMNS:
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name)
+    args = parser.parse_args()
+
+    error = check_options(args.format, args.compression)
+    if error:
+        parser.error(error)
+    filters = ContractFilters(args.start_year, args.end_year, **{name: getattr(args, name) for name in FILTER_COLUMNS})
+
+    out = open(args.out, "wb") if args.out else sys.stdout.buffer
+    written = 0
+    try:
+        for part in export_stream(filters, args.format, args.compression):
+            out.write(part)
+            written += len(part)
+    finally:
+        if args.out:
+            out.close()
+    if args.out:
+        print(f"Wrote {written} bytes to {args.out}")
@@ -0,0 +1,243 @@
+import os
+import time
+import random
+import asyncio
+import calendar
+import argparse
+import httpx
+
+USA_SPENDING_API_URL = os.getenv(
+    "USA_SPENDING_API_URL", "https://api.usaspending.gov/api/v2/search/spending_by_award/"
+)
+
+# Fetcher tuning, overridable from the environment
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", 8))  # Max requests in flight
+FETCH_RATE = float(os.getenv("FETCH_RATE", 4))  # Requests per second (token bucket refill)
+FETCH_BURST = int(os.getenv("FETCH_BURST", 8))  # Token bucket capacity
+MAX_RETRIES = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 30.0
+PAGE_LIMIT = 100
+
+# Status codes the API returns when it is overloaded; everything else is final
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+AWARD_FIELDS = [
+    "generated_internal_id", "Recipient Name", "Award Amount", "Awarding Agency",
+    "Start Date", "End Date", "Funding Agency", "Place of Performance State Code",
+    "Place of Performance Country Code", "Contract Award Type",
+    "NAICS Code", "PSC Code", "Total Outlays", "COVID-19 Obligations",
+    "Awarding Sub Agency", "Funding Sub Agency", "Last Modified Date"
+]
+
+
+def month_bounds(year, month):
+    """Returns the first and last day of a month as ISO date strings."""
+    last_day = calendar.monthrange(year, month)[1]
+    return f"{year}-{month:02d}-01", f"{year}-{month:02d}-{last_day:02d}"
+
+
+def build_params(year, month, page, limit=PAGE_LIMIT, sort=None, order="desc"):
+    """Builds the spending_by_award request body for one (month, page), optionally sorted by a field."""
+    start_date, end_date = month_bounds(year, month)
+    params = {
+        "filters": {
+            "award_type_codes": ["A", "B", "C", "D"],
+            "time_period": [{"start_date": start_date, "end_date": end_date}]
+        },
+        "fields": AWARD_FIELDS,
+        "limit": limit,
+        "page": page
+    }
+    if sort:
+        params["sort"] = sort
+        params["order"] = order
+    return params
+
+
+def parse_award(award):
+    """Maps one API result onto the columns of the contracts table."""
+    return {
+        "contract_id": award.get("generated_internal_id"),
+        "vendor": award.get("Recipient Name", "Unknown"),
+        "award_amount": award.get("Award Amount", 0),
+        "total_outlays": award.get("Total Outlays", 0),
+        "covid_obligations": award.get("COVID-19 Obligations", 0),
+        "agency": award.get("Awarding Agency", "Unknown"),
+        "awarding_sub_agency": award.get("Awarding Sub Agency", "Unknown"),
+        "funding_agency": award.get("Funding Agency", "Unknown"),
+        "funding_sub_agency": award.get("Funding Sub Agency", "Unknown"),
+        "start_date": award.get("Start Date", None),
+        "end_date": award.get("End Date", None),
+        "place_of_performance": f"{award.get('Place of Performance State Code', '')}, {award.get('Place of Performance Country Code', '')}",
+        "contract_category": award.get("Contract Award Type", "Unknown"),
+        "naics_code": award.get("NAICS Code", "Unknown"),
+        "psc_code": award.get("PSC Code", "Unknown"),
+        "last_modified_date": award.get("Last Modified Date", None)  # Not stored; used for watermarks
+    }
+
+
+class TokenBucket:
+    """Async token bucket: allows `burst` requests at once, refilled at `rate` tokens per second."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:  # Serialize waiters so tokens are handed out in order
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncFetcher:
+    """Fetches many (year, month, page) requests concurrently over one pooled HTTP client.
+
+    Concurrency is capped by a semaphore, request starts are paced by a token bucket,
+    and each request retries on 5xx/429/timeouts with exponential backoff and full jitter.
+    """
+
+    def __init__(self, api_url=USA_SPENDING_API_URL, concurrency=FETCH_CONCURRENCY, rate=FETCH_RATE,
+                 burst=FETCH_BURST, max_retries=MAX_RETRIES, base_delay=BASE_DELAY, max_delay=MAX_DELAY,
+                 timeout=30):
+        self.api_url = api_url
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.client = None
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "records": 0}
+
+    async def __aenter__(self):
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self.client = httpx.AsyncClient(
+            limits=limits,
+            timeout=self.timeout,
+            headers={"Content-Type": "application/json"}
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        self.client = None
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff delay for a retry attempt."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def fetch_raw(self, params):
+        """POSTs one request body and returns the decoded JSON, or None after giving up."""
+        for attempt in range(self.max_retries):
+            async with self.semaphore:
+                await self.bucket.acquire()
+                self.stats["requests"] += 1
+                try:
+                    response = await self.client.post(self.api_url, json=params)
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    error = f"{type(e).__name__}"
+                else:
+                    if response.status_code == 200:
+                        return response.json()
+                    if response.status_code not in RETRYABLE_STATUS:
+                        print(f"⚠️ API Error {response.status_code}: {response.text[:200]}")
+                        self.stats["failures"] += 1
+                        return None
+                    error = f"API Error {response.status_code}"
+
+            # Sleep outside the semaphore so other requests can use the slot
+            wait_time = self.backoff(attempt)
+            print(f"⚠️ {error}: retrying in {wait_time:.1f}s (attempt {attempt + 1}/{self.max_retries})...")
+            self.stats["retries"] += 1
+            await asyncio.sleep(wait_time)
+
+        self.stats["failures"] += 1
+        return None
+
+    async def fetch_page(self, year, month, page, limit=PAGE_LIMIT, sort=None):
+        """Fetches one (month, page) and returns parsed contracts, or None if the request failed."""
+        data = await self.fetch_raw(build_params(year, month, page, limit, sort=sort))
+        if data is None:
+            print(f"Skipping {year}-{month:02d} page {page} after multiple failures.")
+            return None
+        contracts = [parse_award(award) for award in data.get("results", [])]
+        self.stats["records"] += len(contracts)
+        return contracts
+
+    async def fetch_many(self, jobs, limit=PAGE_LIMIT, window=None):
+        """Runs (year, month, page) jobs concurrently, yielding (job, contracts) as each completes.
+
+        `jobs` may be any iterable (including a lazy generator); at most `window` jobs are
+        scheduled at once, so finished pages never pile up faster than they are consumed.
+        """
+        async def run(job):
+            return job, await self.fetch_page(*job, limit=limit)
+
+        window = window or self.concurrency * 2
+        jobs = iter(jobs)
+        pending = set()
+        try:
+            while True:
+                for job in jobs:
+                    pending.add(asyncio.ensure_future(run(job)))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+async def fetch_pages_async(jobs, limit=PAGE_LIMIT, **fetcher_options):
+    """Fetches all jobs and returns the contracts deduplicated by contract_id, plus fetcher stats."""
+    contracts = {}
+    async with AsyncFetcher(**fetcher_options) as fetcher:
+        async for (year, month, page), page_contracts in fetcher.fetch_many(jobs, limit=limit):
+            if page_contracts is None:
+                continue
+            for contract in page_contracts:
+                contracts.setdefault(contract["contract_id"], contract)
+            print(f"{len(page_contracts)} contracts fetched for {year}-{month:02d} (page {page})")
+    return list(contracts.values()), fetcher.stats
+
+
+def fetch_pages(jobs, limit=PAGE_LIMIT, **fetcher_options):
+    """Synchronous wrapper around fetch_pages_async for the ingestion scripts."""
+    return asyncio.run(fetch_pages_async(jobs, limit=limit, **fetcher_options))
+
+
+if __name__ == "__main__":
+    # Quick throughput check, e.g. against a local stub:
+    #   python fetcher.py --api-url http://127.0.0.1:8001/api/v2/search/spending_by_award/ --pages 5
+    parser = argparse.ArgumentParser(description="Fetch one year of contracts and report throughput.")
+    parser.add_argument("--year", type=int, default=2020)
+    parser.add_argument("--pages", type=int, default=1, help="Pages per month")
+    parser.add_argument("--api-url", default=USA_SPENDING_API_URL)
+    parser.add_argument("--concurrency", type=int, default=FETCH_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=FETCH_RATE)
+    parser.add_argument("--burst", type=int, default=FETCH_BURST)
+    args = parser.parse_args()
+
+    jobs = [(args.year, month, page) for month in range(1, 13) for page in range(1, args.pages + 1)]
+    started = time.perf_counter()
+    contracts, stats = fetch_pages(
+        jobs, api_url=args.api_url, concurrency=args.concurrency, rate=args.rate, burst=args.burst
+    )
+    elapsed = time.perf_counter() - started
+    print(f"{len(contracts)} unique contracts from {stats['requests']} requests in {elapsed:.2f}s "
+          f"({len(contracts) / elapsed:.1f} records/s, {stats['retries']} retries, {stats['failures']} failures)")
@@ -0,0 +1,76 @@
+import os
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+# Contract volume forecast served by /api/ml/forecast. Prophet's predict takes seconds, so
+# train_forecast_model (ml_model.py) runs it once, over every day from the first observed day to
+# FORECAST_HORIZON_DAYS ahead, and stores the results in contract_forecasts per day and per month.
+# Monthly intervals come from Prophet's predictive samples summed over each month, since daily
+# interval bounds do not add up. A request reads one primary-key range of that table.
+
+FORECAST_HORIZON_DAYS = int(os.getenv("FORECAST_HORIZON_DAYS", 365))
+FORECAST_LEVELS = ("day", "month")
+
+
+def forecast_days(history, horizon_days=FORECAST_HORIZON_DAYS):
+    """Prophet's future frame: every day from the first observed day through the end of the horizon's last month."""
+    last = (history["ds"].max() + pd.Timedelta(days=horizon_days)).to_period("M").end_time.normalize()
+    return pd.DataFrame({"ds": pd.date_range(history["ds"].min(), last)})
+
+
+def compute_forecast(model, history, horizon_days=FORECAST_HORIZON_DAYS):
+    """contract_forecasts rows for a fitted model: daily predictions, then monthly totals."""
+    future = forecast_days(history, horizon_days)
+    last_observed = history["ds"].max()
+    daily = model.predict(future)
+    rows = [
+        {
+            "level": "day", "period": row.ds.date(), "yhat": row.yhat, "yhat_lower": row.yhat_lower,
+            "yhat_upper": row.yhat_upper, "is_forecast": bool(row.ds > last_observed),
+        }
+        for row in daily[["ds", "yhat", "yhat_lower", "yhat_upper"]].itertuples()
+    ]
+
+    # Month totals of each sampled trajectory, then the same interval width as the daily bounds
+    samples = model.predictive_samples(future)["yhat"]  # Days x samples
+    codes, months = pd.factorize(future["ds"].dt.to_period("M"))
+    totals = np.zeros((len(months), samples.shape[1]))
+    np.add.at(totals, codes, samples)
+    yhat = np.bincount(codes, weights=daily["yhat"].to_numpy(), minlength=len(months))
+    tail = (1 - model.interval_width) / 2
+    lower, upper = np.quantile(totals, [tail, 1 - tail], axis=1)
+    for i, month in enumerate(months):
+        rows.append({
+            "level": "month", "period": month.start_time.date(), "yhat": float(yhat[i]), "yhat_lower": float(lower[i]),
+            "yhat_upper": float(upper[i]), "is_forecast": bool(month.end_time.normalize() > last_observed),
+        })
+    return rows
+
+
+def store_forecast(conn, rows):
+    """Replaces the stored forecast; run inside one transaction so readers see the old or the new one."""
+    conn.execute(text("DELETE FROM contract_forecasts"))
+    conn.execute(text("""
+        INSERT INTO contract_forecasts (level, period, yhat, yhat_lower, yhat_upper, is_forecast)
+        VALUES (:level, :period, :yhat, :yhat_lower, :yhat_upper, :is_forecast)
+    """), rows)
+
+
+def forecast_slice(conn, level="day", start=None, end=None):
+    """Stored forecast rows for [start, end] at one level; months overlapping the range are included."""
+    conditions = ["level = :level"]
+    params = {"level": level}
+    if start is not None:
+        conditions.append("period >= :start")
+        params["start"] = start.replace(day=1) if level == "month" else start
+    if end is not None:
+        conditions.append("period <= :end")
+        params["end"] = end
+    query = text(f"""
+        SELECT period, yhat, yhat_lower, yhat_upper, is_forecast
+        FROM contract_forecasts
+        WHERE {" AND ".join(conditions)}
+        ORDER BY period
+    """)
+    return [dict(row._mapping) for row in conn.execute(query, params)]
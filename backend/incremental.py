@@ -0,0 +1,104 @@
+import asyncio
+import argparse
+from datetime import date
+from sqlalchemy.dialects.postgresql import insert
+from database import SessionLocal, IngestWatermark
+from fetcher import AsyncFetcher, PAGE_LIMIT
+from crawl import MAX_PAGES_PER_MONTH
+from ingest import save_contracts
+from rollups import refresh_rollups
+
+# Pages are requested newest-modified first, so paging can stop at the watermark
+WATERMARK_SORT = "Last Modified Date"
+
+
+def load_watermarks(years):
+    """Returns {(year, month): last_modified} for the given years."""
+    with SessionLocal() as session:
+        rows = session.query(IngestWatermark).filter(IngestWatermark.year.in_(list(years))).all()
+        return {(row.year, row.month): row.last_modified for row in rows}
+
+
+def store_watermark(year, month, last_modified):
+    with SessionLocal() as session:
+        stmt = insert(IngestWatermark).values(year=year, month=month, last_modified=last_modified)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=["year", "month"],
+            set_={"last_modified": stmt.excluded.last_modified, "updated_at": stmt.excluded.updated_at}
+        ))
+        session.commit()
+
+
+async def refresh_month(fetcher, year, month, watermark, limit=PAGE_LIMIT, max_pages=MAX_PAGES_PER_MONTH):
+    """Upserts a month's awards modified at or after its watermark; returns the counts.
+
+    Awards arrive newest-modified first, so paging stops at the first award older than the
+    watermark. The watermark only advances when every page needed was fetched and stored.
+    """
+    counts = {"inserted": 0, "updated": 0, "duplicates": 0, "skipped": 0}
+    newest = watermark
+
+    for page in range(1, max_pages + 1):
+        contracts = await fetcher.fetch_page(year, month, page, limit, sort=WATERMARK_SORT)
+        if contracts is None:
+            return counts  # Leave the watermark so the next run retries from it
+
+        # Same-day modifications share a timestamp, so re-read awards equal to the mark;
+        # unchanged ones are not rewritten by the upsert
+        fresh = [
+            contract for contract in contracts
+            if watermark is None or (contract.get("last_modified_date") or "") >= watermark
+        ]
+        if fresh:
+            page_counts = await asyncio.to_thread(save_contracts, fresh, upsert=True, refresh=False)
+            if page_counts is None:
+                return counts  # Not stored: keep the old watermark so the next run re-reads these awards
+            for key in counts:
+                counts[key] += page_counts[key]
+            newest = max(filter(None, [newest] + [c.get("last_modified_date") for c in fresh]), default=None)
+
+        if len(fresh) < len(contracts) or len(contracts) < limit:
+            break
+
+    if newest and newest != watermark:
+        await asyncio.to_thread(store_watermark, year, month, newest)
+    return counts
+
+
+async def refresh_async(years, limit=PAGE_LIMIT, **fetcher_options):
+    """Refreshes every (year, month) of the given years concurrently; returns the totals."""
+    watermarks = load_watermarks(years)
+    today = date.today()
+    months = [
+        (year, month) for year in years for month in range(1, 13)
+        if (year, month) <= (today.year, today.month)
+    ]
+    totals = {"inserted": 0, "updated": 0, "duplicates": 0, "skipped": 0}
+
+    async with AsyncFetcher(**fetcher_options) as fetcher:
+        results = await asyncio.gather(*[
+            refresh_month(fetcher, year, month, watermarks.get((year, month)), limit) for year, month in months
+        ])
+
+    for counts in results:
+        for key in totals:
+            totals[key] += counts[key]
+    await asyncio.to_thread(refresh_rollups)
+    print(f"Incremental refresh: {totals} in {fetcher.stats['requests']} requests "
+          f"({fetcher.stats['retries']} retries, {fetcher.stats['failures']} failures)")
+    return totals
+
+
+def refresh(years, limit=PAGE_LIMIT, **fetcher_options):
+    """Synchronous wrapper around refresh_async."""
+    return asyncio.run(refresh_async(years, limit=limit, **fetcher_options))
+
+
+if __name__ == "__main__":
+    # Nightly delta: python incremental.py --start-year 2015 --end-year 2024
+    parser = argparse.ArgumentParser(description="Fetch only awards modified since the last run.")
+    parser.add_argument("--start-year", type=int, default=2015)
+    parser.add_argument("--end-year", type=int, default=date.today().year)
+    args = parser.parse_args()
+
+    refresh(range(args.start_year, args.end_year + 1))
@@ -0,0 +1,275 @@
+import os
+import json
+import shutil
+import argparse
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from scipy import sparse
+
+# Compiled inference for the award model. Built once when the models load, it replaces the
+# per-request path (DataFrame -> OneHotEncoder.transform -> reindex -> RandomForest.predict)
+# with dictionary lookups into a preallocated feature row and a walk of the forest stored as
+# flat node arrays (about the size of the fitted trees), one step per tree level for all trees
+# at once. Results are bit-identical to award_model.predict: inputs are compared as float32
+# like sklearn's trees, and leaf values are summed tree by tree in the same order before
+# dividing by the number of trees.
+#
+# Each registry bundle (registry.py) stores the compiled pipeline in award_compiled/: one .npy
+# file per forest array plus meta.json with the category lookups. The API maps the arrays
+# read-only, so every worker process shares one page-cache copy of the forest instead of
+# unpickling its own. To compile the pickles in models/ from before the registry:
+#
+#   python inference.py
+
+# Column order the encoder was fitted with (ml_model.train_award_model)
+CATEGORICAL_FEATURES = ["agency", "funding_agency", "place_of_performance", "awarding_sub_agency", "funding_sub_agency"]
+DURATION_FEATURE = "contract_duration"
+
+LEAF = -1  # children_left of a leaf node
+FOREST_ARRAYS = ["roots", "left", "right", "feature", "threshold", "value"]
+COMPILED_DIR = "award_compiled"
+COMPILED_META = "meta.json"
+
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", 10000))
+
+
+def artifact_version(*paths):
+    """Short tag identifying the contents of the model files (survives copies and checkouts, unlike mtimes)."""
+    digest = hashlib.blake2b(digest_size=6)
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def artifact_stats(*paths):
+    """[name, size, mtime] per model file; stored with the compiled copy so an unchanged file isn't hashed again."""
+    stats = []
+    for path in paths:
+        stat = os.stat(path)
+        stats.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return stats
+
+
+def compile_forest(model):
+    """Concatenates every tree's nodes into flat arrays, children as global node indices."""
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    if any(tree.n_outputs != 1 for tree in trees):
+        raise ValueError("Compiled pipeline supports single-output forests only")
+    counts = [tree.node_count for tree in trees]
+    roots = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.intp)  # Native index type: no conversion per lookup
+    return {
+        "roots": roots,
+        "left": np.concatenate([
+            np.where(tree.children_left == LEAF, LEAF, tree.children_left + root) for tree, root in zip(trees, roots)
+        ]).astype(np.intp),
+        "right": np.concatenate([
+            np.where(tree.children_right == LEAF, LEAF, tree.children_right + root) for tree, root in zip(trees, roots)
+        ]).astype(np.intp),
+        "feature": np.concatenate([np.maximum(tree.feature, 0) for tree in trees]).astype(np.intp),  # Leaves have -2; never compared
+        "threshold": np.concatenate([tree.threshold for tree in trees]),
+        "value": np.concatenate([tree.value[:, 0, 0] for tree in trees]),
+    }
+
+
+class CompiledAwardPipeline:
+    def __init__(self, columns, duration_column, n_features, arrays, version=None, sources=None):
+        self.columns = columns  # Per categorical feature: category -> row index
+        self.duration_column = duration_column
+        self.n_features = n_features
+        for name in FOREST_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.n_trees = len(self.roots)
+        self.version = version
+        self.sources = sources  # artifact_stats of the files `version` was computed from
+        self.local = threading.local()  # Preallocated feature row per worker thread
+
+    @classmethod
+    def from_model(cls, model, encoder, feature_order, version=None, sources=None):
+        if getattr(encoder, "drop_idx_", None) is not None or any(getattr(encoder, "infrequent_categories_", None) or []):
+            raise ValueError("Compiled pipeline needs a OneHotEncoder without drop or infrequent categories")
+        if model.n_features_in_ != len(feature_order):
+            raise ValueError(
+                f"Feature dimension mismatch: Model expects {model.n_features_in_}, feature order has {len(feature_order)}"
+            )
+        position = {name: index for index, name in enumerate(feature_order)}
+
+        # One-hot column k of the encoder is named str(k); map each category straight to its row index
+        columns = []
+        offset = 0
+        for categories in encoder.categories_:
+            columns.append({
+                category: position[str(offset + j)]
+                for j, category in enumerate(categories) if str(offset + j) in position
+            })
+            offset += len(categories)
+        return cls(columns, position[DURATION_FEATURE], len(feature_order), compile_forest(model), version, sources)
+
+    def save(self, directory):
+        """Writes the forest as .npy files (loadable with mmap_mode) and the lookups as JSON.
+
+        The files go to a sibling staging directory that is then renamed into place, so files
+        other processes have mapped are replaced, never rewritten under them.
+        """
+        directory = os.path.abspath(directory)
+        staging = f"{directory}.staging-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        try:
+            for name in FOREST_ARRAYS:
+                np.save(os.path.join(staging, f"{name}.npy"), np.asarray(getattr(self, name)))
+            meta = {
+                "version": self.version,
+                "sources": self.sources,
+                "n_features": self.n_features,
+                "duration_column": self.duration_column,
+                "columns": self.columns,
+            }
+            with open(os.path.join(staging, COMPILED_META), "w") as f:
+                json.dump(meta, f)  # Written last: its presence marks a complete artifact
+            if os.path.exists(directory):
+                # A directory can't be renamed over a non-empty one: move the old copy aside first
+                previous = f"{directory}.previous-{os.getpid()}"
+                os.rename(directory, previous)
+                os.rename(staging, directory)
+                shutil.rmtree(previous)  # Mapped files stay readable until their last map is closed
+            else:
+                os.rename(staging, directory)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """Maps the forest arrays read-only, so every worker process shares one page-cache copy."""
+        with open(os.path.join(directory, COMPILED_META)) as f:
+            meta = json.load(f)
+        # Plain ndarray views of the maps: np.memmap's Python-level indexing hooks cost more than the walk
+        arrays = {
+            name: np.asarray(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)) for name in FOREST_ARRAYS
+        }
+        return cls(meta["columns"], meta["duration_column"], meta["n_features"], arrays, meta["version"], meta.get("sources"))
+
+    def row(self):
+        row = getattr(self.local, "row", None)
+        if row is None:
+            row = self.local.row = np.zeros(self.n_features, dtype=np.float32)
+        return row
+
+    def encode(self, row, values, contract_duration):
+        """Fills row in place; returns the indices set, so the caller can reset them."""
+        hot = [columns[value] for columns, value in zip(self.columns, values) if value in columns]
+        row[hot] = 1.0
+        row[self.duration_column] = float(contract_duration)
+        return hot + [self.duration_column]
+
+    def key(self, values, contract_duration):
+        """What the model actually sees: the one-hot column per feature (None if unseen) and the float32 duration."""
+        return tuple(columns.get(value) for columns, value in zip(self.columns, values)) + (float(np.float32(contract_duration)),)
+
+    def encode_batch(self, values, contract_durations):
+        """Sparse float32 matrix in the model's feature order; values holds one list per categorical feature."""
+        n = len(contract_durations)
+        rows, columns = [], []
+        for feature_columns, feature_values in zip(self.columns, values):
+            for i, value in enumerate(feature_values):
+                column = feature_columns.get(value)
+                if column is not None:
+                    rows.append(i)
+                    columns.append(column)
+        data = np.ones(len(rows) + n, dtype=np.float32)
+        data[len(rows):] = contract_durations
+        rows.extend(range(n))
+        columns.extend([self.duration_column] * n)
+        return sparse.csr_matrix((data, (rows, columns)), shape=(n, self.n_features))
+
+    def leaf_values(self, row):
+        """Leaf value per tree, in tree order; trees drop out of the walk once they reach a leaf."""
+        leaves = np.empty(self.n_trees, dtype=np.intp)
+        trees = np.arange(self.n_trees)
+        nodes = self.roots
+        while len(nodes):
+            left = self.left[nodes]
+            done = left == LEAF
+            if done.any():
+                leaves[trees[done]] = nodes[done]
+                inner = ~done
+                trees, nodes, left = trees[inner], nodes[inner], left[inner]
+                if not len(nodes):
+                    break
+            go_left = row[self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, left, self.right[nodes])
+        return self.value[leaves]
+
+    def predict(self, agency, funding_agency, place, awarding_sub_agency, funding_sub_agency, contract_duration):
+        """Same value as award_model.predict on the encoded row."""
+        row = self.row()
+        touched = self.encode(row, (agency, funding_agency, place, awarding_sub_agency, funding_sub_agency), contract_duration)
+        try:
+            total = 0.0
+            for value in self.leaf_values(row).tolist():  # Sequential, like the forest's accumulation
+                total += value
+            return total / self.n_trees
+        finally:
+            row[touched] = 0.0
+
+
+class PredictionCache:
+    """LRU cache of predictions keyed on the normalized input, cleared when the model version changes."""
+
+    def __init__(self, max_entries=PREDICTION_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.version = None
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def predict(self, pipeline, agency, funding_agency, place, awarding_sub_agency, funding_sub_agency, contract_duration):
+        values = (agency, funding_agency, place, awarding_sub_agency, funding_sub_agency)
+        key = pipeline.key(values, contract_duration)
+        with self.lock:
+            if pipeline.version != self.version:
+                if self.entries:
+                    self.stats["invalidations"] += 1
+                self.entries.clear()  # Cached for another model
+                self.version = pipeline.version
+            prediction = self.entries.get(key)
+            if prediction is not None:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return prediction
+            self.stats["misses"] += 1
+        prediction = pipeline.predict(*values, contract_duration)
+        with self.lock:
+            if pipeline.version == self.version:
+                self.entries[key] = prediction
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.stats["evictions"] += 1
+        return prediction
+
+    def snapshot(self):
+        with self.lock:
+            return {**self.stats, "entries": len(self.entries), "max_entries": self.max_entries, "model_version": self.version}
+
+
+prediction_cache = PredictionCache()
+
+
+if __name__ == "__main__":
+    import joblib
+
+    models_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+    parser = argparse.ArgumentParser(description="Compile the pickled award model into memory-mappable arrays.")
+    parser.add_argument("--models-dir", default=models_dir)
+    args = parser.parse_args()
+
+    paths = [os.path.join(args.models_dir, name) for name in ("award_prediction.pkl", "one_hot_encoder.pkl", "feature_order.pkl")]
+    pipeline = CompiledAwardPipeline.from_model(
+        *(joblib.load(path) for path in paths), version=artifact_version(*paths), sources=artifact_stats(*paths)
+    )
+    pipeline.save(os.path.join(args.models_dir, COMPILED_DIR))
+    print(f"Compiled {pipeline.n_trees} trees ({len(pipeline.value)} nodes) into {os.path.join(args.models_dir, COMPILED_DIR)}")
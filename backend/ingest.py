@@ -0,0 +1,326 @@
+import json
+import math
+import asyncio
+import hashlib
+from sqlalchemy import text, or_, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from database import SessionLocal, Contract, engine, BUMP_GENERATION
+from fetcher import AsyncFetcher, PAGE_LIMIT
+from rollups import refresh_rollups
+
+# Columns written by ingestion (id comes from the sequence)
+CONTRACT_COLUMNS = [column.name for column in Contract.__table__.columns if column.name != "id"]
+
+# Rows per INSERT statement; keeps each statement well under Postgres' bind-parameter limit
+BULK_CHUNK_SIZE = 1000
+
+# Columns the API revises after an award is first published; upserts refresh these
+UPDATABLE_COLUMNS = ["award_amount", "total_outlays", "covid_obligations", "end_date"]
+
+# Rows per committed batch in the streaming pipeline
+STREAM_BATCH_SIZE = 1000
+
+# Bloom filter sizing for data_pipeline.py --bloom: 10M ids at a 0.1% false-positive rate take
+# about 18 MB, against several hundred MB for a set of the same ids. A false positive makes the
+# stream drop a new contract as a duplicate, so about 1 in 1,000 new contracts is missed per run
+# (a later run with a set picks them up).
+BLOOM_CAPACITY = 10_000_000
+BLOOM_ERROR_RATE = 0.001
+
+
+def prepare_batch(contracts):
+    """Validates a batch and drops in-batch duplicates.
+
+    Returns (rows, duplicate_count, skipped_count) where every row carries all CONTRACT_COLUMNS.
+    """
+    rows = {}
+    duplicate_count = 0
+    skipped_count = 0
+
+    for contract in contracts:
+        if not isinstance(contract, dict):
+            print(f"Invalid contract format: {contract}")
+            continue
+
+        if not contract.get("contract_id") or contract.get("award_amount") is None:
+            print(f"Skipping contract due to missing ID or amount: {contract}")
+            skipped_count += 1
+            continue
+
+        if contract["contract_id"] in rows:
+            duplicate_count += 1
+            continue
+
+        rows[contract["contract_id"]] = {column: contract.get(column) for column in CONTRACT_COLUMNS}
+
+    return list(rows.values()), duplicate_count, skipped_count
+
+
+_partitioned = None
+
+
+def contracts_partitioned(session):
+    """Whether contracts is the year-partitioned table from migrations.py (checked once per process)."""
+    global _partitioned
+    if _partitioned is None:
+        _partitioned = session.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'contracts'::regclass)"
+        )).scalar()
+    return _partitioned
+
+
+# A partitioned contracts table can't hold a unique index on contract_id alone, so uniqueness lives in
+# contract_keys (migrations.py), kept in step by triggers on contracts. Rows are written only when
+# their id has no key yet; a concurrent writer that slips in between fails the batch rather than
+# storing a second row. A batch is passed as one JSON array and expanded to contracts rows.
+BATCH_ROWS = "jsonb_populate_recordset(NULL::contracts, CAST(:rows AS jsonb)) AS batch"
+
+INSERT_UNKEYED_ROWS = text(f"""
+    INSERT INTO contracts ({', '.join(CONTRACT_COLUMNS)})
+    SELECT {', '.join(CONTRACT_COLUMNS)} FROM {BATCH_ROWS}
+    WHERE NOT EXISTS (SELECT 1 FROM contract_keys k WHERE k.contract_id = batch.contract_id)
+    RETURNING contract_id
+""")
+
+UPDATE_KEYED_ROWS = text(f"""
+    UPDATE contracts AS c SET {', '.join(f'{column} = batch.{column}' for column in UPDATABLE_COLUMNS)}
+    FROM {BATCH_ROWS}
+    WHERE c.contract_id = batch.contract_id
+      AND ({' OR '.join(f'c.{column} IS DISTINCT FROM batch.{column}' for column in UPDATABLE_COLUMNS)})
+    RETURNING c.contract_id
+""")
+
+
+def batch_json(rows):
+    return json.dumps(rows, default=str)  # Dates as ISO strings
+
+
+def bulk_insert_rows(session, rows):
+    """Inserts prepared rows with multi-row INSERT ... ON CONFLICT DO NOTHING; returns the inserted count."""
+    inserted_count = 0
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        chunk = rows[start:start + BULK_CHUNK_SIZE]
+        if contracts_partitioned(session):
+            inserted_count += len(session.execute(INSERT_UNKEYED_ROWS, {"rows": batch_json(chunk)}).fetchall())
+            continue
+        stmt = (
+            insert(Contract)
+            .values(chunk)
+            .on_conflict_do_nothing(index_elements=["contract_id"])
+            .returning(Contract.contract_id)
+        )
+        inserted_count += len(session.execute(stmt).fetchall())
+    return inserted_count
+
+
+def upsert_rows(session, rows):
+    """Inserts new rows and updates stored rows whose amounts changed; returns (inserted, updated).
+
+    Unchanged rows are left alone (not rewritten), so they count as duplicates.
+    """
+    inserted_count = 0
+    updated_count = 0
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        chunk = rows[start:start + BULK_CHUNK_SIZE]
+        if contracts_partitioned(session):
+            # Update stored rows first, so the rows inserted next aren't compared again
+            params = {"rows": batch_json(chunk)}
+            updated_count += len(session.execute(UPDATE_KEYED_ROWS, params).fetchall())
+            inserted_count += len(session.execute(INSERT_UNKEYED_ROWS, params).fetchall())
+            continue
+        stmt = insert(Contract).values(chunk)
+        changed = or_(*[
+            Contract.__table__.c[column].is_distinct_from(stmt.excluded[column]) for column in UPDATABLE_COLUMNS
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["contract_id"],
+            set_={column: stmt.excluded[column] for column in UPDATABLE_COLUMNS},
+            where=changed
+        ).returning(literal_column("xmax = 0").label("inserted"))  # xmax is 0 only for fresh inserts
+        for (inserted,) in session.execute(stmt):
+            if inserted:
+                inserted_count += 1
+            else:
+                updated_count += 1
+    return inserted_count, updated_count
+
+
+def insert_rows_per_row(session, rows):
+    """Original path: one existence query and one ORM add per row; returns the inserted count."""
+    inserted_count = 0
+    for row in rows:
+        existing_contract = session.query(Contract).filter_by(contract_id=row["contract_id"]).first()
+        if not existing_contract:
+            session.add(Contract(**row))
+            inserted_count += 1
+    return inserted_count
+
+
+def write_batch(session, contracts, bulk=True, upsert=False):
+    """Writes a batch inside the caller's transaction (no commit); returns the counts dict.
+
+    With upsert=True stored rows whose UPDATABLE_COLUMNS changed are updated instead of skipped.
+    counts["stored_ids"] lists the contract_ids that are in the table once the batch commits
+    (new or already stored), i.e. every valid row of the batch.
+    """
+    rows, duplicate_count, skipped_count = prepare_batch(contracts)
+    updated_count = 0
+    if upsert:
+        inserted_count, updated_count = upsert_rows(session, rows)
+    elif bulk:
+        inserted_count = bulk_insert_rows(session, rows)
+    else:
+        inserted_count = insert_rows_per_row(session, rows)
+
+    if inserted_count or updated_count:
+        session.execute(BUMP_GENERATION)
+
+    return {
+        "inserted": inserted_count,
+        "updated": updated_count,
+        "duplicates": duplicate_count + len(rows) - inserted_count - updated_count,  # In-batch + already stored
+        "skipped": skipped_count,
+        "stored_ids": [row["contract_id"] for row in rows]
+    }
+
+
+def print_counts(counts):
+    print(f"Inserted {counts['inserted']} new contracts into PostgreSQL.")
+    if counts.get("updated"):
+        print(f"Updated {counts['updated']} changed contracts.")
+    print(f"Skipped {counts['duplicates']} duplicate contracts.")
+    print(f"Skipped {counts['skipped']} contracts due to missing data.")
+
+
+def save_contracts(contracts, bulk=True, upsert=False, refresh=True):
+    """Saves contracts to PostgreSQL while skipping duplicates.
+
+    Returns a dict with inserted, updated, duplicates and skipped counts, or None if the write
+    failed and was rolled back. With bulk=False the original per-row existence check is used
+    (kept for benchmarking); with upsert=True changed rows are updated rather than skipped.
+    Callers writing many batches pass refresh=False and refresh the rollup medians once at the end.
+    """
+    counts = {"inserted": 0, "updated": 0, "duplicates": 0, "skipped": 0}
+
+    if not isinstance(contracts, list):
+        print(f"Expected list of contracts but got {type(contracts)}")
+        return counts
+
+    with SessionLocal() as session:
+        try:
+            counts = write_batch(session, contracts, bulk=bulk, upsert=upsert)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Error saving to DB: {e}")
+            return None
+
+    if refresh:
+        refresh_rollups()
+
+    print_counts(counts)
+    return counts
+
+
+# ========================== STREAMING PIPELINE ========================== #
+
+class BloomFilter:
+    """Fixed-size probabilistic set of contract_ids.
+
+    Membership can return a false positive (about `error_rate` of the time), so a new
+    contract may occasionally be dropped as a duplicate; memory stays constant no matter
+    how many ids are added.
+    """
+
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+
+
+def load_existing_ids(seen=None):
+    """Streams every stored contract_id into `seen` (a set by default, or a BloomFilter)."""
+    seen = set() if seen is None else seen
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=10000).execute(
+            text("SELECT contract_id FROM contracts")
+        )
+        for (contract_id,) in result:
+            seen.add(contract_id)
+    return seen
+
+
+async def iter_contracts(pages):
+    """Flattens (job, contracts) pages from AsyncFetcher.fetch_many into single contracts."""
+    async for _, contracts in pages:
+        for contract in contracts or []:
+            yield contract
+
+
+async def dedupe(contracts, seen, counts):
+    """Drops contracts whose id is already stored.
+
+    `seen` only grows once a batch commits (see ingest_stream_async), so a contract whose batch
+    failed or was skipped for missing data is still written if it turns up again. Repeats inside
+    the batch being filled are dropped by prepare_batch.
+    """
+    async for contract in contracts:
+        contract_id = contract.get("contract_id")
+        if contract_id and contract_id in seen:
+            counts["duplicates"] += 1
+            continue
+        yield contract
+
+
+async def batched(contracts, size):
+    batch = []
+    async for contract in contracts:
+        batch.append(contract)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def ingest_stream_async(jobs, seen=None, batch_size=STREAM_BATCH_SIZE, limit=PAGE_LIMIT, **fetcher_options):
+    """Fetch -> normalize -> dedupe -> batched writer, without holding more than one batch in memory.
+
+    Each batch is committed as soon as it fills, so rows become visible while the crawl runs.
+    Returns the inserted, duplicates and skipped totals.
+    """
+    seen = load_existing_ids() if seen is None else seen
+    counts = {"inserted": 0, "updated": 0, "duplicates": 0, "skipped": 0}
+
+    async with AsyncFetcher(**fetcher_options) as fetcher:
+        contracts = dedupe(iter_contracts(fetcher.fetch_many(jobs, limit=limit)), seen, counts)
+        async for batch in batched(contracts, batch_size):
+            batch_counts = await asyncio.to_thread(save_contracts, batch, refresh=False)
+            if batch_counts is None:
+                continue
+            for contract_id in batch_counts["stored_ids"]:
+                seen.add(contract_id)
+            for key in counts:
+                counts[key] += batch_counts[key]
+
+    await asyncio.to_thread(refresh_rollups)
+    print(f"Stream finished: {counts} in {fetcher.stats['requests']} requests")
+    return counts
+
+
+def ingest_stream(jobs, seen=None, batch_size=STREAM_BATCH_SIZE, limit=PAGE_LIMIT, **fetcher_options):
+    """Synchronous wrapper around ingest_stream_async."""
+    return asyncio.run(ingest_stream_async(jobs, seen=seen, batch_size=batch_size, limit=limit, **fetcher_options))
@@ -0,0 +1,272 @@
+import time
+import asyncio
+import threading
+import numpy as np
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from sqlalchemy import text
+from database import engine
+
+# Autocomplete for the free-text fields the prediction form takes. Each field keeps its distinct
+# values in memory, ranked by contract count: a sorted list of (word suffix, value) answers
+# "starts a word with" prefix queries by bisection, and a trigram index backs fuzzy matches for
+# typos. Ranking runs on NumPy arrays packed once per refresh, so a lookup costs a few array
+# operations over the matching range rather than Python work per matching value. A background
+# task appends counts for rows above the last id it saw whenever the data generation moves, and
+# rebuilds from scratch when rows were updated or deleted. Refreshes build and warm new indexes
+# to the side and swap them in by reference, so lookups never wait on a refresh.
+
+LOOKUP_FIELDS = {
+    "agency": "agency",
+    "sub_agency": "awarding_sub_agency",
+    "funding_agency": "funding_agency",
+    "funding_sub_agency": "funding_sub_agency",
+    "place": "place_of_performance",
+    "vendor": "vendor",
+}
+
+REFRESH_SECONDS = 5.0
+MAX_RESULTS = 50
+MEMO_MAX_ENTRIES = 4096  # Ranked results per query, kept until the values change
+WARM_PREFIX_LENGTH = 2  # Prefixes up to this long are ranked ahead of time after each refresh
+FUZZY_MIN_SIMILARITY = 0.5  # Share of the query's trigrams found in the value
+BULK_SORT_THRESHOLD = 1000  # Re-sort instead of insort()ing when more new values arrive at once
+
+
+def trigrams(text_value):
+    padded = f"  {text_value.casefold()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PrefixIndex:
+    """Distinct values of one field with their contract counts."""
+
+    def __init__(self):
+        self.values = []  # Value id -> value
+        self.ids = {}
+        self.counts = []
+        self.entries = []  # Sorted (casefolded suffix starting at a word, value id, suffix is the whole value)
+        self.postings = {}  # Trigram -> value ids
+        self.memo = OrderedDict()
+        self.pack()
+
+    def word_suffixes(self, key):
+        return [key[i:] for i in range(len(key)) if i == 0 or (key[i - 1] in " -/,(&" and key[i] != " ")]
+
+    def count(self, value):
+        return self.counts[self.ids[value]]
+
+    def add(self, counts):
+        """Adds contract counts per value; new values are indexed."""
+        if not counts:
+            return
+        new_entries = []
+        for value, count in counts.items():
+            value_id = self.ids.get(value)
+            if value_id is None:
+                value_id = self.ids[value] = len(self.values)
+                self.values.append(value)
+                self.counts.append(0)
+                key = value.casefold()
+                new_entries.extend((suffix, value_id, i == 0) for i, suffix in enumerate(self.word_suffixes(key)))
+                for gram in trigrams(value):
+                    self.postings.setdefault(gram, []).append(value_id)
+            self.counts[value_id] += count
+        if len(new_entries) > BULK_SORT_THRESHOLD:
+            self.entries.extend(new_entries)
+            self.entries.sort()
+        else:
+            for entry in new_entries:
+                insort(self.entries, entry)
+        self.pack()
+
+    def copy(self):
+        """A separate index with the same values, to add() to without touching this one."""
+        index = PrefixIndex.__new__(PrefixIndex)
+        index.values = list(self.values)
+        index.ids = dict(self.ids)
+        index.counts = list(self.counts)
+        index.entries = list(self.entries)
+        index.postings = {gram: list(value_ids) for gram, value_ids in self.postings.items()}
+        # Packed arrays are replaced, never modified, so they can be shared until the next pack()
+        index.count_array, index.alpha_rank = self.count_array, self.alpha_rank
+        index.entry_ids, index.entry_starts = self.entry_ids, self.entry_starts
+        index.posting_arrays = {}
+        index.memo = OrderedDict()
+        return index
+
+    def pack(self):
+        """Rebuilds the arrays the lookups rank with."""
+        self.count_array = np.array(self.counts, dtype=np.int64)
+        self.alpha_rank = np.empty(len(self.values), dtype=np.int64)  # Position in alphabetical order
+        self.alpha_rank[sorted(range(len(self.values)), key=self.values.__getitem__)] = np.arange(len(self.values))
+        self.entry_ids = np.fromiter((entry[1] for entry in self.entries), dtype=np.int64, count=len(self.entries))
+        self.entry_starts = np.fromiter((entry[2] for entry in self.entries), dtype=bool, count=len(self.entries))
+        self.posting_arrays = {}
+        self.memo.clear()
+
+    def posting_array(self, gram):
+        array = self.posting_arrays.get(gram)
+        if array is None:
+            array = self.posting_arrays[gram] = np.array(self.postings.get(gram, ()), dtype=np.int64)
+        return array
+
+    def remember(self, key, results):
+        self.memo[key] = results
+        if len(self.memo) > MEMO_MAX_ENTRIES:
+            self.memo.popitem(last=False)
+        return results
+
+    def top(self, ids, limit):
+        """Up to `limit` of the value ids, by contract count then alphabetically."""
+        ids = ids[self.count_array[ids] > 0]
+        score = -self.count_array[ids] * len(self.values) + self.alpha_rank[ids]  # Unique per value
+        if len(ids) > limit:
+            keep = np.argpartition(score, limit - 1)[:limit]
+            ids, score = ids[keep], score[keep]
+        return ids[np.argsort(score)].tolist()
+
+    def search(self, prefix, limit):
+        """Values with a word starting with prefix: full-prefix matches first, then by contract count."""
+        key = prefix.casefold().strip()
+        ranked = self.memo.get(("prefix", key))
+        if ranked is None:
+            low = bisect_left(self.entries, (key,))
+            high = bisect_left(self.entries, (key + "\U0010ffff",), low)
+            ids = self.entry_ids[low:high]
+            full = np.unique(ids[self.entry_starts[low:high]])
+            ranked_ids = self.top(full, MAX_RESULTS)
+            if len(ranked_ids) < MAX_RESULTS:
+                rest = np.setdiff1d(np.unique(ids), full, assume_unique=True)
+                ranked_ids += self.top(rest, MAX_RESULTS - len(ranked_ids))
+            ranked = self.remember(("prefix", key), [self.values[value_id] for value_id in ranked_ids])
+        return ranked[:limit]
+
+    def short_prefixes(self):
+        prefixes = {""}
+        for suffix, _, _ in self.entries:
+            prefixes.update(suffix[:length] for length in range(1, WARM_PREFIX_LENGTH + 1))
+        return prefixes
+
+    def fuzzy(self, query, limit):
+        """Values containing enough of the query's trigrams (like pg_trgm word_similarity), best first."""
+        ranked = self.memo.get(("fuzzy", query))
+        if ranked is None:
+            query_grams = trigrams(query)
+            postings = [self.posting_array(gram) for gram in query_grams if gram in self.postings]
+            ranked = []
+            if postings:
+                common = np.bincount(np.concatenate(postings), minlength=len(self.values))
+                ids = np.flatnonzero(common)
+                similarity = common[ids] / len(query_grams)
+                keep = (similarity >= FUZZY_MIN_SIMILARITY) & (self.count_array[ids] > 0)
+                ids, similarity = ids[keep], similarity[keep]
+                order = np.lexsort((self.alpha_rank[ids], -self.count_array[ids], -similarity))[:MAX_RESULTS]
+                ranked = [self.values[value_id] for value_id in ids[order]]
+            self.remember(("fuzzy", query), ranked)
+        return ranked[:limit]
+
+
+class LookupStore:
+    def __init__(self):
+        self.indexes = {}
+        self.max_id = 0
+        self.row_count = 0
+        self.generation = None
+        self.refresh_lock = threading.Lock()
+        self.stats = {"full_loads": 0, "incremental_loads": 0, "last_refresh_ms": 0.0}
+
+    @property
+    def ready(self):
+        return bool(self.indexes)
+
+    def load_counts(self, conn, after_id):
+        """Contract counts per value of every field for rows with id > after_id; one scan (GROUPING SETS).
+
+        Returns (counts by field, max id, row count).
+        """
+        columns = ", ".join(f"{column} AS {field}" for field, column in LOOKUP_FIELDS.items())
+        sets = ", ".join(f"({column})" for column in LOOKUP_FIELDS.values())
+        query = text(f"""
+            SELECT {columns}, COUNT(*) AS contract_count, MAX(id) AS max_id,
+                   GROUPING({", ".join(LOOKUP_FIELDS.values())}) AS grouping_id
+            FROM contracts
+            WHERE id > :after_id
+            GROUP BY GROUPING SETS ({sets}, ())
+        """)
+        fields = list(LOOKUP_FIELDS)
+        counts = {field: {} for field in fields}
+        max_id, row_count = after_id, 0
+        for row in conn.execute(query, {"after_id": after_id}):
+            # GROUPING() sets one bit per column, first column highest; a zero bit marks the grouped one
+            grouped = [field for i, field in enumerate(fields) if not row.grouping_id >> (len(fields) - 1 - i) & 1]
+            if not grouped:
+                max_id, row_count = row.max_id or after_id, row.contract_count
+            elif getattr(row, grouped[0]) is not None:
+                counts[grouped[0]][getattr(row, grouped[0])] = row.contract_count
+        return counts, max_id, row_count
+
+    def refresh(self):
+        with self.refresh_lock:
+            started = time.perf_counter()
+            with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+                generation = conn.execute(text("SELECT generation FROM data_generation WHERE id = 1")).scalar()
+                total = conn.execute(text("SELECT COALESCE(SUM(contract_count), 0) FROM rollup_agencies")).scalar()
+                if self.ready:
+                    # Changed fields get a copy with the new counts; the live indexes stay untouched
+                    counts, max_id, row_count = self.load_counts(conn, self.max_id)
+                    indexes, changed = dict(self.indexes), []
+                    for field, field_counts in counts.items():
+                        if field_counts:
+                            indexes[field] = indexes[field].copy()
+                            indexes[field].add(field_counts)
+                            changed.append(indexes[field])
+                    row_count += self.row_count
+                    self.stats["incremental_loads"] += 1
+                if not self.ready or row_count != total:
+                    # First load, or rows were updated/deleted since: rebuild
+                    counts, max_id, row_count = self.load_counts(conn, 0)
+                    indexes = {field: PrefixIndex() for field in LOOKUP_FIELDS}
+                    for field, field_counts in counts.items():
+                        indexes[field].add(field_counts)
+                    changed = list(indexes.values())
+                    self.stats["full_loads"] += 1
+            self.warm(changed)
+            self.indexes, self.max_id, self.row_count = indexes, max_id, row_count  # Swap in
+            self.generation = generation
+            self.stats["last_refresh_ms"] = (time.perf_counter() - started) * 1000
+
+    def warm(self, indexes):
+        """Ranks the broadest (shortest) prefixes of indexes not yet live, so no lookup pays for scanning them."""
+        for index in indexes:
+            for prefix in index.short_prefixes():
+                index.search(prefix, 0)
+
+    def refresh_if_changed(self):
+        with engine.connect() as conn:
+            generation = conn.execute(text("SELECT generation FROM data_generation WHERE id = 1")).scalar()
+        if generation != self.generation:
+            self.refresh()
+
+    async def run_refresher(self):
+        """Background task keeping the indexes current with ingestion."""
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh_if_changed)
+            except Exception as e:
+                print(f"Lookup refresh failed: {e}")
+            await asyncio.sleep(REFRESH_SECONDS)
+
+    def lookup(self, field, prefix, limit=10, fuzzy=True):
+        """[{value, contract_count}] for values with a word starting with prefix, topped up with fuzzy matches.
+
+        Runs on the event loop: refreshes never modify a live index, so there is nothing to wait on.
+        """
+        index = self.indexes[field]
+        values = index.search(prefix, limit)
+        if fuzzy and len(values) < limit and len(prefix.strip()) >= 3:
+            values += [value for value in index.fuzzy(prefix, limit) if value not in values][:limit - len(values)]
+        return [{"value": value, "contract_count": index.count(value)} for value in values]
+
+
+lookup_store = LookupStore()
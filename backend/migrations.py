@@ -0,0 +1,256 @@
+import argparse
+from datetime import date
+from sqlalchemy import text
+from database import engine, CONTRACT_COUNTS_DDL, ROLLUPS_DDL, AWARD_SKETCHES_DDL
+
+# Ordered schema migrations for tables that already exist (create_all in database.py only
+# creates missing tables). Applied versions are recorded in schema_migrations.
+#
+#   python migrations.py                 # apply pending default migrations
+#   python migrations.py --partition     # also convert contracts to yearly range partitions
+#   python migrations.py --add-partitions-through 2030
+
+# Composite and expression indexes for the analytics filters and group-bys
+CONTRACT_INDEXES = [
+    ("ix_contracts_start_date", "(start_date)"),
+    ("ix_contracts_agency_start_date", "(agency, start_date)"),
+    ("ix_contracts_place_start_date", "(place_of_performance, start_date)"),
+    ("ix_contracts_category_start_date", "(contract_category, start_date)"),
+    ("ix_contracts_sub_agency_start_date", "(awarding_sub_agency, start_date)"),
+    ("ix_contracts_start_year_month", "((EXTRACT(YEAR FROM start_date)), (EXTRACT(MONTH FROM start_date)))"),
+]
+
+
+# Filter indexes for the analytics query parameters (analytics.py) and keyset order of the ranked rollups
+FILTER_INDEXES = [
+    ("ix_contracts_naics_start_date", "contracts", "(naics_code, start_date)"),
+    ("ix_contracts_psc_start_date", "contracts", "(psc_code, start_date)"),
+    ("ix_rollup_agencies_rank", "rollup_agencies", "(contract_count DESC, agency)"),
+    ("ix_rollup_places_rank", "rollup_places", "(contract_count DESC, place_of_performance)"),
+]
+
+# Keyset pages order names byte-wise (COLLATE "C", see analytics.py), so the ranking indexes must too
+RANK_INDEXES = [
+    ("ix_rollup_agencies_rank", "rollup_agencies", '(contract_count DESC, agency COLLATE "C")'),
+    ("ix_rollup_places_rank", "rollup_places", '(contract_count DESC, place_of_performance COLLATE "C")'),
+]
+
+
+def create_indexes(conn, indexes, concurrently=True):
+    # CONCURRENTLY keeps the table writable while building, but is not allowed on partitioned tables
+    mode = "CONCURRENTLY " if concurrently else ""
+    for name, table, columns in indexes:
+        print(f"Creating index {name}...")
+        conn.execute(text(f"CREATE INDEX {mode}IF NOT EXISTS {name} ON {table} {columns}"))
+
+
+def create_contract_indexes(conn, concurrently=True):
+    create_indexes(conn, [(name, "contracts", columns) for name, columns in CONTRACT_INDEXES], concurrently)
+
+
+def create_filter_indexes(conn):
+    partitioned = is_partitioned(conn)
+    for index in FILTER_INDEXES:
+        create_indexes(conn, [index], concurrently=not (partitioned and index[1] == "contracts"))
+
+
+def rebuild_rank_indexes(conn):
+    for name, _, _ in RANK_INDEXES:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    create_indexes(conn, RANK_INDEXES)
+
+
+def is_partitioned(conn):
+    return conn.execute(text("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'contracts'::regclass
+        )
+    """)).scalar()
+
+
+# contract_id uniqueness on the partitioned table (see ingest.py): one row per stored contract_id,
+# maintained by statement triggers on contracts. A second row for a stored id fails its statement.
+CONTRACT_KEYS_DDL = [
+    "CREATE TABLE contract_keys (contract_id VARCHAR(50) PRIMARY KEY)",
+    "INSERT INTO contract_keys SELECT DISTINCT contract_id FROM contracts",
+    """
+    CREATE OR REPLACE FUNCTION contract_keys_apply() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO contract_keys SELECT contract_id FROM new_rows;
+        ELSIF TG_OP = 'UPDATE' THEN
+            INSERT INTO contract_keys
+            SELECT contract_id FROM new_rows EXCEPT SELECT contract_id FROM old_rows;
+        END IF;
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            DELETE FROM contract_keys k USING old_rows o
+            WHERE k.contract_id = o.contract_id
+              AND NOT EXISTS (SELECT 1 FROM contracts c WHERE c.contract_id = o.contract_id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER contract_keys_insert AFTER INSERT ON contracts
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION contract_keys_apply()
+    """,
+    """
+    CREATE TRIGGER contract_keys_update AFTER UPDATE ON contracts
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION contract_keys_apply()
+    """,
+    """
+    CREATE TRIGGER contract_keys_delete AFTER DELETE ON contracts
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION contract_keys_apply()
+    """,
+]
+
+
+def create_contract_keys(conn):
+    """Enforces contract_id uniqueness on a partitioned contracts table through contract_keys.
+
+    Rows stored twice under the (contract_id, start_date) key (NULL or changed start dates) are
+    removed first, keeping the newest copy of each contract.
+    """
+    if not is_partitioned(conn) or conn.execute(text("SELECT to_regclass('contract_keys') IS NOT NULL")).scalar():
+        return
+    removed = conn.execute(text("""
+        DELETE FROM contracts c USING contracts newer
+        WHERE newer.contract_id = c.contract_id AND newer.id > c.id
+    """)).rowcount
+    for statement in CONTRACT_KEYS_DDL:
+        conn.execute(text(statement))
+    print(f"Created contract_keys ({removed} duplicate contract rows removed).")
+
+
+def create_year_partition(conn, year):
+    """Adds the partition for one start year, moving any rows the default partition holds for it."""
+    name = f"contracts_y{year}"
+    exists = conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+    if exists:
+        return
+    bounds = f"FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+    conn.execute(text(f"CREATE TABLE {name} (LIKE contracts INCLUDING DEFAULTS)"))
+    # Statements on the partition itself don't fire the parent's counter/rollup triggers
+    conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM contracts_default
+            WHERE start_date >= DATE '{year}-01-01' AND start_date < DATE '{year + 1}-01-01'
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """))
+    conn.execute(text(f"ALTER TABLE contracts ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    print(f"Attached partition {name}")
+
+
+def partition_contracts_by_year(conn):
+    """Rebuilds contracts as a table range-partitioned by start_date year.
+
+    Unique constraints on a partitioned table must include the partition key, so the table's own
+    unique index becomes (contract_id, start_date) and contract_id uniqueness moves to the
+    contract_keys table. Rows without a start_date live in the default partition.
+    """
+    if is_partitioned(conn):
+        print("contracts is already partitioned.")
+        return
+
+    years = conn.execute(text("""
+        SELECT EXTRACT(YEAR FROM MIN(start_date))::int, EXTRACT(YEAR FROM MAX(start_date))::int FROM contracts
+    """)).one()
+    first_year = years[0] or date.today().year
+    last_year = max(years[1] or first_year, date.today().year) + 1
+
+    conn.execute(text("LOCK TABLE contracts IN ACCESS EXCLUSIVE MODE"))
+    conn.execute(text("ALTER SEQUENCE contracts_id_seq OWNED BY NONE"))  # Keep it when the old table is dropped
+    conn.execute(text("ALTER TABLE contracts RENAME TO contracts_unpartitioned"))
+    conn.execute(text("""
+        CREATE TABLE contracts (LIKE contracts_unpartitioned INCLUDING DEFAULTS)
+        PARTITION BY RANGE (start_date)
+    """))
+    conn.execute(text("CREATE TABLE contracts_default PARTITION OF contracts DEFAULT"))
+    for year in range(first_year, last_year + 1):
+        conn.execute(text(f"""
+            CREATE TABLE contracts_y{year} PARTITION OF contracts
+            FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')
+        """))
+
+    # Copy before the triggers exist: counters and rollups already include these rows
+    conn.execute(text("INSERT INTO contracts SELECT * FROM contracts_unpartitioned"))
+    conn.execute(text("DROP TABLE contracts_unpartitioned"))
+    conn.execute(text("ALTER SEQUENCE contracts_id_seq OWNED BY contracts.id"))
+
+    conn.execute(text("CREATE INDEX ix_contracts_id ON contracts (id)"))
+    conn.execute(text("CREATE UNIQUE INDEX ux_contracts_contract_id_start_date ON contracts (contract_id, start_date)"))
+    create_contract_indexes(conn, concurrently=False)
+    create_indexes(conn, [index for index in FILTER_INDEXES if index[1] == "contracts"], concurrently=False)
+
+    # Trigger statements (not the function definitions or backfills) from database.py
+    for statement in CONTRACT_COUNTS_DDL + ROLLUPS_DDL + AWARD_SKETCHES_DDL:
+        if statement.strip().startswith("CREATE TRIGGER"):
+            conn.execute(text(statement))
+    create_contract_keys(conn)
+    print(f"Partitioned contracts by year: {first_year}-{last_year} plus default.")
+
+
+# (version, description, function, runs in a transaction, opt-in flag)
+MIGRATIONS = [
+    ("001", "composite and expression indexes on contracts", create_contract_indexes, False, None),
+    ("002", "range-partition contracts by start_date year", partition_contracts_by_year, True, "partition"),
+    ("003", "NAICS/PSC filter indexes and rollup ranking indexes", create_filter_indexes, False, None),
+    ("004", "rollup ranking indexes in C collation", rebuild_rank_indexes, False, None),
+    ("005", "contract_id uniqueness on partitioned contracts", create_contract_keys, True, None),
+]
+
+
+def applied_versions():
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(20) PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+        """))
+        return {row.version for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def record(conn, version, description):
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+        {"version": version, "description": description}
+    )
+
+
+def migrate(options=()):
+    """Applies pending migrations in order; opt-in ones only when their flag is in `options`."""
+    applied = applied_versions()
+    for version, description, migration, transactional, flag in MIGRATIONS:
+        if version in applied or (flag and flag not in options):
+            continue
+        print(f"Applying {version}: {description}")
+        if transactional:
+            with engine.begin() as conn:
+                migration(conn)
+                record(conn, version, description)
+        else:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                migration(conn)
+                record(conn, version, description)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply schema migrations to the contracts database.")
+    parser.add_argument("--partition", action="store_true", help="Also convert contracts to yearly partitions")
+    parser.add_argument("--add-partitions-through", type=int, metavar="YEAR",
+                        help="Create yearly partitions up to YEAR on a partitioned contracts table")
+    args = parser.parse_args()
+
+    migrate({"partition"} if args.partition else set())
+
+    if args.add_partitions_through:
+        with engine.begin() as conn:
+            if not is_partitioned(conn):
+                raise SystemExit("contracts is not partitioned; run with --partition first.")
+            for year in range(date.today().year, args.add_partitions_through + 1):
+                create_year_partition(conn, year)
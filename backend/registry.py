@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import threading
+import joblib
+from inference import CompiledAwardPipeline, COMPILED_DIR, COMPILED_META, artifact_version, artifact_stats
+from artifacts import LazyArtifact, memory_usage
+
+# Versioned award-model bundles. Every training run writes its model, encoder, feature order
+# and compiled forest into a staging directory, renames it to models/registry/<version>/ (atomic,
+# so a bundle is complete or absent) and then points models/registry/CURRENT at it. The API
+# serves one loaded ModelBundle at a time: a watcher swaps in the version CURRENT names once it
+# is fully loaded, and requests in flight finish on the bundle they started with.
+#
+#   python registry.py list
+#   python registry.py activate 20261018-132600042-3fa2c1    # roll back or forward
+#   python registry.py import-legacy                      # register the pickles in models/
+#   python registry.py prune --keep 5
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+REGISTRY_DIR = os.path.join(MODEL_DIR, "registry")
+CURRENT_FILE = "CURRENT"
+MANIFEST = "manifest.json"
+
+AWARD_MODEL_FILE = "award_prediction.pkl"
+ENCODER_FILE = "one_hot_encoder.pkl"
+FEATURE_ORDER_FILE = "feature_order.pkl"
+
+LEGACY_VERSION = "legacy"  # The fixed paths in models/, used until a bundle is registered
+WATCH_SECONDS = float(os.getenv("MODEL_WATCH_SECONDS", "10"))
+KEEP_VERSIONS = 5
+
+
+def write_atomic(path, content):
+    staging = f"{path}.tmp"
+    with open(staging, "w") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(staging, path)
+
+
+def utc_timestamp():
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def new_version():
+    """Sorts in publish order: UTC timestamp to the millisecond (no DST repeats), then a random suffix."""
+    now = time.time()
+    return f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime(now))}{int(now * 1000) % 1000:03d}-{os.urandom(3).hex()}"
+
+
+def bundle_dir(version, registry_dir=REGISTRY_DIR):
+    return MODEL_DIR if version == LEGACY_VERSION else os.path.join(registry_dir, version)
+
+
+def read_manifest(version, registry_dir=REGISTRY_DIR):
+    with open(os.path.join(registry_dir, version, MANIFEST)) as f:
+        return json.load(f)
+
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    """Complete bundles, oldest first."""
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(registry_dir)
+        if not name.startswith(".") and os.path.exists(os.path.join(registry_dir, name, MANIFEST))
+    )
+
+
+def current_version(registry_dir=REGISTRY_DIR):
+    try:
+        with open(os.path.join(registry_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def activate(version, registry_dir=REGISTRY_DIR):
+    if version not in list_versions(registry_dir):
+        raise ValueError(f"Unknown model version '{version}'")
+    write_atomic(os.path.join(registry_dir, CURRENT_FILE), version)
+
+
+def publish(model, encoder, feature_order, registry_dir=REGISTRY_DIR, metadata=None, make_current=True):
+    """Writes a complete bundle under a new version and (by default) makes it current; returns the version."""
+    version = new_version()
+    staging = os.path.join(registry_dir, f".staging-{version}")
+    os.makedirs(staging)
+    try:
+        joblib.dump(model, os.path.join(staging, AWARD_MODEL_FILE))
+        joblib.dump(encoder, os.path.join(staging, ENCODER_FILE))
+        joblib.dump(feature_order, os.path.join(staging, FEATURE_ORDER_FILE))
+        CompiledAwardPipeline.from_model(model, encoder, feature_order, version).save(os.path.join(staging, COMPILED_DIR))
+        manifest = {"version": version, "created_at": utc_timestamp(), **(metadata or {})}
+        write_atomic(os.path.join(staging, MANIFEST), json.dumps(manifest, indent=2))
+        os.rename(staging, os.path.join(registry_dir, version))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if make_current:
+        activate(version, registry_dir)
+    print(f"Published award model bundle {version}")
+    return version
+
+
+def prune(keep=KEEP_VERSIONS, registry_dir=REGISTRY_DIR):
+    """Deletes the oldest bundles beyond `keep`, never the current one."""
+    current = current_version(registry_dir)
+    removed = [version for version in list_versions(registry_dir)[:-keep] if version != current] if keep else []
+    for version in removed:
+        shutil.rmtree(os.path.join(registry_dir, version))
+    return removed
+
+
+# ========================== SERVING ========================== #
+
+class ModelBundle:
+    """One version's compiled pipeline (mapped now) and pickled forest (loaded on first batch request)."""
+
+    def __init__(self, version, directory):
+        self.version = version
+        self.directory = directory
+        before = memory_usage()
+        started = time.perf_counter()
+        self.model = LazyArtifact(f"award_model {version}", lambda: joblib.load(self.path(AWARD_MODEL_FILE)))
+        self.pipeline = self.load_pipeline()
+        self.stats = {
+            "load_ms": round((time.perf_counter() - started) * 1000, 1),
+            "memory_before": before,
+            "memory_after": memory_usage(),
+        }
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def load_pipeline(self):
+        if self.version != LEGACY_VERSION:
+            return CompiledAwardPipeline.load(self.path(COMPILED_DIR))
+        # Fixed paths: the compiled copy may predate the pickles (see inference.py). The pickles are
+        # hashed only when their sizes or mtimes differ from those the compiled copy recorded.
+        paths = [self.path(AWARD_MODEL_FILE), self.path(ENCODER_FILE), self.path(FEATURE_ORDER_FILE)]
+        sources = artifact_stats(*paths)
+        version = None
+        if os.path.exists(os.path.join(self.path(COMPILED_DIR), COMPILED_META)):
+            pipeline = CompiledAwardPipeline.load(self.path(COMPILED_DIR))
+            if pipeline.sources == sources:
+                return pipeline
+            version = artifact_version(*paths)
+            if pipeline.version == version:
+                return pipeline
+            print("Compiled award model is older than the pickles; compiling in memory (run python inference.py to save it)")
+        encoder = joblib.load(self.path(ENCODER_FILE))
+        feature_order = joblib.load(self.path(FEATURE_ORDER_FILE))
+        return CompiledAwardPipeline.from_model(
+            self.model.get(), encoder, feature_order, version or artifact_version(*paths), sources
+        )
+
+    def warm(self):
+        """One prediction, so the first request after a swap doesn't fault in the tree roots."""
+        self.pipeline.predict(*[next(iter(columns), None) for columns in self.pipeline.columns], 365)
+
+    def report(self):
+        return {"version": self.version, "pipeline_version": self.pipeline.version, **self.stats}
+
+
+class LiveModels:
+    """The bundle the API serves; replaced in a single assignment once its successor is loaded."""
+
+    def __init__(self, registry_dir=REGISTRY_DIR):
+        self.registry_dir = registry_dir
+        self.bundle = None
+        self.swap_lock = threading.Lock()  # One load at a time; readers never wait on it once a bundle is live
+        self.stats = {"swaps": 0, "failed_swaps": 0, "last_swap_at": None}
+
+    def target_version(self):
+        return current_version(self.registry_dir) or LEGACY_VERSION
+
+    def get(self):
+        bundle = self.bundle
+        return bundle if bundle is not None else self.swap()
+
+    def swap(self, version=None):
+        """Loads `version` (default: what CURRENT names) and makes it live; no-op if it already is."""
+        with self.swap_lock:
+            version = version or self.target_version()
+            if self.bundle is not None and self.bundle.version == version:
+                return self.bundle
+            bundle = ModelBundle(version, bundle_dir(version, self.registry_dir))
+            bundle.warm()
+            previous, self.bundle = self.bundle, bundle
+            if previous is not None:
+                self.stats["swaps"] += 1
+                self.stats["last_swap_at"] = utc_timestamp()
+                print(f"Swapped award model {previous.version} -> {version} in {bundle.stats['load_ms']:.0f} ms")
+            return bundle
+
+    def check(self):
+        if self.bundle is not None and self.bundle.version != self.target_version():
+            self.swap()
+
+    async def run_watcher(self):
+        """Background task following CURRENT, so every worker picks up a new or rolled-back version."""
+        while True:
+            try:
+                await asyncio.to_thread(self.check)
+            except Exception as e:
+                self.stats["failed_swaps"] += 1
+                print(f"Model swap failed: {e}")
+            await asyncio.sleep(WATCH_SECONDS)
+
+    def report(self):
+        bundle = self.bundle
+        return {
+            "live": bundle.report() if bundle else None,
+            "current": current_version(self.registry_dir),
+            **self.stats,
+        }
+
+
+live_models = LiveModels()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage versioned award model bundles.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list")
+    activate_parser = commands.add_parser("activate")
+    activate_parser.add_argument("version")
+    commands.add_parser("import-legacy")
+    prune_parser = commands.add_parser("prune")
+    prune_parser.add_argument("--keep", type=int, default=KEEP_VERSIONS)
+    args = parser.parse_args()
+
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    if args.command == "list":
+        current = current_version()
+        for version in list_versions():
+            print(f"{'*' if version == current else ' '} {version}  {json.dumps(read_manifest(version))}")
+    elif args.command == "activate":
+        try:
+            activate(args.version)
+        except ValueError as e:
+            sys.exit(str(e))
+        print(f"CURRENT -> {args.version}; running APIs swap within {WATCH_SECONDS:.0f} s")
+    elif args.command == "import-legacy":
+        publish(
+            joblib.load(os.path.join(MODEL_DIR, AWARD_MODEL_FILE)),
+            joblib.load(os.path.join(MODEL_DIR, ENCODER_FILE)),
+            joblib.load(os.path.join(MODEL_DIR, FEATURE_ORDER_FILE)),
+            metadata={"source": "legacy"},
+        )
+    elif args.command == "prune":
+        print(f"Removed {', '.join(prune(args.keep)) or 'nothing'}")
@@ -0,0 +1,81 @@
+from sqlalchemy import text
+from database import engine, BUMP_GENERATION
+
+# Readers for the dashboard rollup tables (see database.py). Counts and award totals are
+# kept exact by triggers on contracts; only the per-month medians need refresh_rollups(),
+# which each ingestion run calls once, after its last batch. Months stay marked dirty until
+# then, so a run that stops early leaves them for the next refresh.
+
+# Calendar-year window the monthly trends chart covers
+TREND_START_YEAR = 2015
+TREND_END_YEAR = 2024
+
+REFRESH_MEDIANS_QUERY = text("""
+    WITH dirty AS (
+        DELETE FROM rollup_dirty_months RETURNING month
+    )
+    INSERT INTO rollup_month_medians (month, median_award_amount)
+    SELECT dirty.month, (
+        SELECT PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY award_amount)
+        FROM contracts
+        WHERE start_date >= make_date(:start_year, 1, 1)
+          AND start_date < make_date(:end_year + 1, 1, 1)  -- Range form: prunes year partitions
+          AND EXTRACT(MONTH FROM start_date) = dirty.month
+    )
+    FROM dirty
+    ON CONFLICT (month) DO UPDATE SET median_award_amount = EXCLUDED.median_award_amount
+    RETURNING month
+""")
+
+
+def refresh_rollups(conn=None):
+    """Recomputes medians for calendar months touched since the last refresh; returns those months."""
+    if conn is None:
+        with engine.begin() as conn:
+            return refresh_rollups(conn)
+    result = conn.execute(REFRESH_MEDIANS_QUERY, {"start_year": TREND_START_YEAR, "end_year": TREND_END_YEAR})
+    months = [row.month for row in result]
+    if months:
+        conn.execute(BUMP_GENERATION)  # Responses cached after the batch commit still had stale medians
+    return months
+
+
+def monthly_trends(conn):
+    query = text("""
+        SELECT counts.month, SUM(counts.contract_count) AS contract_count, medians.median_award_amount
+        FROM contract_counts counts
+        LEFT JOIN rollup_month_medians medians ON medians.month = counts.month
+        WHERE counts.year BETWEEN :start_year AND :end_year
+        GROUP BY counts.month, medians.median_award_amount
+        HAVING SUM(counts.contract_count) > 0
+        ORDER BY counts.month
+    """)
+    result = conn.execute(query, {"start_year": TREND_START_YEAR, "end_year": TREND_END_YEAR})
+    return [dict(row._mapping) for row in result]
+
+
+def category_breakdown(conn):
+    query = text("""
+        SELECT NULLIF(contract_category, '') AS contract_category,
+               contract_count * 100.0 / SUM(contract_count) OVER () AS contract_percentage
+        FROM rollup_categories
+        WHERE contract_count > 0
+    """)
+    return [dict(row._mapping) for row in conn.execute(query)]
+
+
+def dashboard(conn, limit=10):
+    """Top agencies, top places and every category from the rollups in one statement."""
+    query = text("""
+        (SELECT 'agency' AS facet, agency AS key, contract_count, total_award FROM rollup_agencies
+         WHERE contract_count > 0 ORDER BY contract_count DESC, agency COLLATE "C" LIMIT :limit)
+        UNION ALL
+        (SELECT 'place', place_of_performance, contract_count, total_award FROM rollup_places
+         WHERE contract_count > 0 ORDER BY contract_count DESC, place_of_performance COLLATE "C" LIMIT :limit)
+        UNION ALL
+        (SELECT 'category', NULLIF(contract_category, ''), contract_count, NULL FROM rollup_categories
+         WHERE contract_count > 0)
+        UNION ALL
+        (SELECT 'total', NULL, COALESCE(SUM(contract_count), 0), COALESCE(SUM(total_award), 0) FROM rollup_agencies)
+    """)
+    return [dict(row._mapping) for row in conn.execute(query, {"limit": limit})]
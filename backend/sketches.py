@@ -0,0 +1,106 @@
+import math
+from fastapi import HTTPException
+from sqlalchemy import text
+from database import SKETCH_RELATIVE_ACCURACY
+from analytics import ContractFilters
+from rollups import TREND_START_YEAR, TREND_END_YEAR
+
+# Percentiles of award_amount from the award_sketches buckets (see database.py). A query sums
+# bucket counts over the requested months, so its cost depends on the number of buckets, not on
+# the number of contracts, and results are within SKETCH_RELATIVE_ACCURACY of the exact value.
+
+GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+
+# Filter parameter -> sketch dimension; only one of them can be set per query
+SKETCH_DIMENSIONS = {"agency": "agency", "place": "place", "category": "category"}
+
+DEFAULT_QUANTILES = [0.5, 0.9, 0.99]
+
+
+def supports(filters):
+    return len(filters.values) <= 1 and all(name in SKETCH_DIMENSIONS for name in filters.values)
+
+
+def bucket_value(sign, bucket):
+    """Representative amount of a bucket: within the relative accuracy of every amount in it."""
+    return sign * 2 * GAMMA ** bucket / (GAMMA + 1)
+
+
+def load_buckets(conn, filters, by_month=False):
+    """Merged bucket counts for the filtered slice: {month or None: [(sign, bucket, count)]}."""
+    dimension, value = "", ""
+    for name, filter_value in filters.values.items():
+        dimension = SKETCH_DIMENSIONS[name]
+        value = filter_value
+    conditions = ["dimension = :dimension", "value = :value", "count <> 0"]
+    params = {"dimension": dimension, "value": value}
+    if filters.start_year is not None:
+        conditions.append("year >= :start_year")
+        params["start_year"] = filters.start_year
+    if filters.end_year is not None:
+        conditions.append("year BETWEEN 1 AND :end_year")
+        params["end_year"] = filters.end_year
+    month = "month" if by_month else "NULL::int"
+    query = text(f"""
+        SELECT {month} AS month, sign, bucket, SUM(count) AS count
+        FROM award_sketches
+        WHERE {" AND ".join(conditions)}
+        GROUP BY 1, 2, 3
+        HAVING SUM(count) > 0
+    """)
+    buckets = {}
+    for row in conn.execute(query, params):
+        buckets.setdefault(row.month, []).append((row.sign, row.bucket, int(row.count)))
+    return buckets
+
+
+def quantiles(buckets, qs):
+    """Approximate quantiles (lower nearest rank) of merged buckets; returns (count, {q: amount})."""
+    # Ascending amount order: large negatives first, then zero, then positives
+    ordered = sorted(buckets, key=lambda b: (b[0], b[1] * b[0]))
+    count = sum(b[2] for b in ordered)
+    if not count:
+        return 0, {q: None for q in qs}
+    results = {}
+    for q in qs:
+        rank = q * (count - 1)
+        seen = 0
+        for sign, bucket, bucket_count in ordered:
+            seen += bucket_count
+            if seen > rank:
+                results[q] = bucket_value(sign, bucket)
+                break
+    return count, results
+
+
+def award_percentiles(conn, filters, qs=DEFAULT_QUANTILES):
+    count, values = quantiles(load_buckets(conn, filters).get(None, []), qs)
+    return {
+        "contract_count": count,
+        "relative_accuracy": SKETCH_RELATIVE_ACCURACY,
+        "percentiles": {f"p{round(q * 100, 3):g}": value for q, value in values.items()},
+    }
+
+
+def monthly_trends(conn, filters):
+    """Same rows as analytics.monthly_trends, with the median read from the sketches.
+
+    Only served for monthly-trends?approximate=true: a bucket estimate is not an interpolated
+    PERCENTILE_CONT, and small or even-count months can differ from it by more than the accuracy.
+    """
+    if filters.start_year is None and filters.end_year is None:
+        filters = ContractFilters(TREND_START_YEAR, TREND_END_YEAR, **filters.values)
+    trends = []
+    for month, buckets in sorted(load_buckets(conn, filters, by_month=True).items()):
+        if month == 0:
+            continue  # Contracts without a start_date
+        count, values = quantiles(buckets, [0.5])
+        trends.append({"month": month, "contract_count": count, "median_award_amount": values[0.5]})
+    return trends
+
+
+def parse_quantiles(values):
+    qs = values or DEFAULT_QUANTILES
+    if any(not 0 <= q <= 1 or math.isnan(q) for q in qs):
+        raise HTTPException(status_code=400, detail="Quantiles must be between 0 and 1")
+    return qs
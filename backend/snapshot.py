@@ -0,0 +1,248 @@
+import os
+import io
+import argparse
+import subprocess
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from database import engine, BUMP_GENERATION
+from rollups import refresh_rollups
+
+# Snapshot tooling for the contracts table:
+#   python snapshot.py load-dump ../backup.dump          # pg_dump archive -> COPY
+#   python snapshot.py export-parquet ../snapshots/latest
+#   python snapshot.py load-parquet ../snapshots/latest
+#
+# Loads COPY rows into an unconstrained staging table, then merges the contracts not stored yet
+# (ids come from the sequence, not the snapshot), so they work on an empty database as well as
+# on top of existing rows.
+
+SNAPSHOT_COLUMNS = [
+    "id", "contract_id", "vendor", "award_amount", "total_outlays", "covid_obligations",
+    "agency", "awarding_sub_agency", "funding_agency", "funding_sub_agency",
+    "start_date", "end_date", "place_of_performance", "contract_category", "naics_code", "psc_code"
+]
+
+ARROW_SCHEMA = pa.schema([
+    ("id", pa.int32()),
+    ("contract_id", pa.string()),
+    ("vendor", pa.string()),
+    ("award_amount", pa.float64()),
+    ("total_outlays", pa.float64()),
+    ("covid_obligations", pa.float64()),
+    ("agency", pa.string()),
+    ("awarding_sub_agency", pa.string()),
+    ("funding_agency", pa.string()),
+    ("funding_sub_agency", pa.string()),
+    ("start_date", pa.date32()),
+    ("end_date", pa.date32()),
+    ("place_of_performance", pa.string()),
+    ("contract_category", pa.string()),
+    ("naics_code", pa.string()),
+    ("psc_code", pa.string()),
+])
+
+EXPORT_CHUNK_SIZE = 50000
+UNKNOWN_YEAR = "unknown"  # Partition for rows without a start_date
+
+
+# ========================== LOADING ========================== #
+
+def create_staging(cur):
+    # CREATE TABLE AS copies column types but not the NOT NULL/unique constraints
+    cur.execute("DROP TABLE IF EXISTS contracts_staging")
+    cur.execute("CREATE TEMP TABLE contracts_staging AS SELECT * FROM contracts WITH NO DATA")
+
+
+def merge_staging(cur):
+    """Moves staged contracts not stored yet into contracts; returns (inserted, skipped).
+
+    Skipped rows are incomplete, repeat a contract_id within the snapshot, or are already stored.
+    Existing contract_ids are skipped explicitly, through contract_keys on the partitioned table
+    (see ingest.py), so the load never trips a uniqueness check.
+    """
+    columns = ", ".join(column for column in SNAPSHOT_COLUMNS if column != "id")
+    cur.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'contracts'::regclass)")
+    keys = "contract_keys" if cur.fetchone()[0] else "contracts"
+    complete = "contract_id IS NOT NULL AND award_amount IS NOT NULL AND agency IS NOT NULL"
+    stored = f"EXISTS (SELECT 1 FROM {keys} k WHERE k.contract_id = s.contract_id)"
+    cur.execute(f"""
+        SELECT COUNT(*), COUNT(*) FILTER (WHERE {complete}),
+               COUNT(DISTINCT contract_id) FILTER (WHERE {complete}),
+               COUNT(DISTINCT contract_id) FILTER (WHERE {complete} AND {stored})
+        FROM contracts_staging s
+    """)
+    staged, complete_count, distinct_count, existing = cur.fetchone()
+    cur.execute(f"""
+        INSERT INTO contracts ({columns})
+        SELECT DISTINCT ON (contract_id) {columns} FROM contracts_staging s
+        WHERE {complete} AND NOT {stored}
+        ORDER BY contract_id, id
+    """)
+    inserted = cur.rowcount
+    skipped = (staged - complete_count) + (complete_count - distinct_count) + existing
+    if inserted + skipped != staged:
+        raise RuntimeError(f"Merged {inserted} + skipped {skipped} rows, but {staged} were staged")
+    if inserted:
+        cur.execute(str(BUMP_GENERATION))
+    cur.execute("DROP TABLE contracts_staging")
+    return inserted, skipped
+
+
+def copy_and_merge(copy_into_staging):
+    """Runs copy_into_staging(cursor) against a fresh staging table, then merges and analyzes."""
+    conn = engine.raw_connection()
+    try:
+        cur = conn.cursor()
+        create_staging(cur)
+        copy_into_staging(cur)
+        inserted, skipped = merge_staging(cur)
+        conn.commit()
+        cur.execute("ANALYZE contracts")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    refresh_rollups()
+    print(f"Loaded {inserted} contracts ({skipped} duplicates or incomplete rows skipped).")
+    return inserted
+
+
+class CopySection(io.RawIOBase):
+    """File-like view over the data lines of the contracts COPY block in pg_restore's SQL output."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.columns = None
+        self.buffer = b""
+        self.done = False
+        for line in self.lines:
+            if line.startswith(b"COPY ") and b".contracts (" in line:
+                self.columns = line[line.index(b"(") + 1:line.index(b")")].decode().replace(" ", "").split(",")
+                break
+        if self.columns is None:
+            raise ValueError("No COPY block for the contracts table found in the dump.")
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self.done and len(self.buffer) < len(b):
+            line = next(self.lines, b"\\.\n")
+            if line.rstrip(b"\n") == b"\\.":
+                self.done = True
+            else:
+                self.buffer += line
+        size = min(len(b), len(self.buffer))
+        b[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+def load_dump(path):
+    """Bulk-loads the contracts rows of a pg_dump custom archive (backup.dump/backup.sql) via COPY."""
+    process = subprocess.Popen(
+        ["pg_restore", "--data-only", "--table=contracts", "--file=-", path],
+        stdout=subprocess.PIPE
+    )
+    try:
+        section = CopySection(iter(process.stdout))
+        columns = ", ".join(section.columns)
+        inserted = copy_and_merge(
+            lambda cur: cur.copy_expert(f"COPY contracts_staging ({columns}) FROM STDIN", section)
+        )
+    finally:
+        process.stdout.close()
+        process.wait()
+    return inserted
+
+
+def load_parquet(directory, years=None):
+    """Bulk-loads a Parquet snapshot written by export_parquet via COPY."""
+    dataset = open_snapshot(directory)
+    scanner = dataset.scanner(columns=SNAPSHOT_COLUMNS, filter=year_filter(years), batch_size=EXPORT_CHUNK_SIZE)
+    columns = ", ".join(SNAPSHOT_COLUMNS)
+
+    def copy_batches(cur):
+        for batch in scanner.to_batches():
+            buffer = io.BytesIO()
+            pa_csv.write_csv(pa.Table.from_batches([batch]), buffer)  # Nulls become unquoted empty fields
+            buffer.seek(0)
+            cur.copy_expert(f"COPY contracts_staging ({columns}) FROM STDIN WITH (FORMAT csv, HEADER true)", buffer)
+
+    return copy_and_merge(copy_batches)
+
+
+# ========================== PARQUET SNAPSHOTS ========================== #
+
+def export_parquet(directory):
+    """Writes contracts to Hive-style partitions (start_year=YYYY/part-0.parquet) via a server-side cursor."""
+    writers = {}
+    total = 0
+    query = text(f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM contracts ORDER BY start_date, id")
+
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_SIZE).execute(query)
+        try:
+            for rows in result.partitions():
+                by_year = {}
+                for row in rows:
+                    year = str(row.start_date.year) if row.start_date else UNKNOWN_YEAR
+                    by_year.setdefault(year, []).append(dict(row._mapping))
+                for year, year_rows in by_year.items():
+                    if year not in writers:
+                        partition = os.path.join(directory, f"start_year={year}")
+                        os.makedirs(partition, exist_ok=True)
+                        writers[year] = pq.ParquetWriter(
+                            os.path.join(partition, "part-0.parquet"), ARROW_SCHEMA, compression="zstd"
+                        )
+                    writers[year].write_table(pa.Table.from_pylist(year_rows, schema=ARROW_SCHEMA))
+                total += len(rows)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+    print(f"Exported {total} contracts into {len(writers)} partitions under {directory}")
+    return total
+
+
+def open_snapshot(directory):
+    partitioning = pa.schema([("start_year", pa.string())])
+    return ds.dataset(directory, format="parquet", schema=pa.unify_schemas([ARROW_SCHEMA, partitioning]),
+                      partitioning=ds.partitioning(partitioning, flavor="hive"))
+
+
+def year_filter(years):
+    if not years:
+        return None
+    return ds.field("start_year").isin([str(year) for year in years])
+
+
+def read_snapshot(directory, years=None, columns=None):
+    """Reads a Parquet snapshot into a DataFrame, pruning partitions to `years` when given."""
+    table = open_snapshot(directory).to_table(columns=columns, filter=year_filter(years))
+    return table.to_pandas()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk restore and snapshot the contracts table.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    load_dump_parser = commands.add_parser("load-dump", help="COPY rows from a pg_dump custom archive")
+    load_dump_parser.add_argument("path")
+    load_parquet_parser = commands.add_parser("load-parquet", help="COPY rows from a Parquet snapshot")
+    load_parquet_parser.add_argument("directory")
+    load_parquet_parser.add_argument("--years", type=int, nargs="*")
+    export_parser = commands.add_parser("export-parquet", help="Write contracts to Parquet partitioned by start year")
+    export_parser.add_argument("directory")
+    args = parser.parse_args()
+
+    if args.command == "load-dump":
+        load_dump(args.path)
+    elif args.command == "load-parquet":
+        load_parquet(args.directory, args.years)
+    else:
+        export_parquet(args.directory)
@@ -21,25 +21,20 @@ export default function MLPredictions() {
 
   // Fetch dropdown options from API
   useEffect(() => {
-    axios.get("http://localhost:8000/api/contracts/agency-funding")
+    // One request for all three facets (agencies, categories, places)
+    axios.get("http://localhost:8000/api/contracts/dashboard")
       .then(response => {
-        const agencyData = response.data.map((item: any) => item.agency);
+        const agencyData = response.data.agency_funding.map((item: any) => item.agency);
         setAgencies(agencyData);
-      })
-      .catch(error => console.error("Error fetching agencies:", error));
 
-    axios.get("http://localhost:8000/api/contracts/category-breakdown")
-      .then(response => {
-        const filteredCategories = response.data
+        const filteredCategories = response.data.category_breakdown
             .map((item: any) => item.contract_category)
             .filter((category: string) => !["BPA CALL", "PO", "DO", "DCA"].includes(category)); // Remove duplicates
         setCategories(filteredCategories);
-      })
-      .catch(error => console.error("Error fetching contract categories:", error));
 
-    axios.get("http://localhost:8000/api/contracts/place-performance")
-      .then(response => setPlaces(response.data.map((item: any) => item.place_of_performance)))
-      .catch(error => console.error("Error fetching places:", error));
+        setPlaces(response.data.place_performance.map((item: any) => item.place_of_performance));
+      })
+      .catch(error => console.error("Error fetching dropdown options:", error));
   }, []);
 
   // Predict award amount
@@ -15,17 +15,14 @@ export default function UserInputPrediction() {
 
   // Fetch dropdown options from API
   useEffect(() => {
-    axios.get("http://localhost:8000/api/contracts/agency-funding")
-      .then(response => setAgencies(response.data.map((item: any) => item.agency)))
-      .catch(error => console.error("Error fetching agencies:", error));
-
-    axios.get("http://localhost:8000/api/contracts/category-breakdown")
-      .then(response => setCategories(response.data.map((item: any) => item.contract_category)))
-      .catch(error => console.error("Error fetching contract categories:", error));
-
-    axios.get("http://localhost:8000/api/contracts/place-performance")
-      .then(response => setPlaces(response.data.map((item: any) => item.place_of_performance)))
-      .catch(error => console.error("Error fetching places:", error));
+    // One request for all three facets (agencies, categories, places)
+    axios.get("http://localhost:8000/api/contracts/dashboard")
+      .then(response => {
+        setAgencies(response.data.agency_funding.map((item: any) => item.agency));
+        setCategories(response.data.category_breakdown.map((item: any) => item.contract_category));
+        setPlaces(response.data.place_performance.map((item: any) => item.place_of_performance));
+      })
+      .catch(error => console.error("Error fetching dropdown options:", error));
   }, []);
 
   // Predict award amount